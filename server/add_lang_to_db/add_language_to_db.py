@@ -1,5 +1,6 @@
 import subprocess
 import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
 
 # Set up argument parsing
@@ -7,6 +8,10 @@ parser = argparse.ArgumentParser(description="Run all scripts with provided argu
 parser.add_argument("language", help="Language of the dump files (e.g., 'el').")
 parser.add_argument("dump_date", help="Date of the dump files (e.g., '20240720').")
 parser.add_argument("password", help="Password for the database.")
+parser.add_argument("--jobs", type=int, default=1,
+                    help="Stages to run at the same time once their dependencies are done.")
+parser.add_argument("--workers", type=int, default=1,
+                    help="Processes each dump-parsing stage uses to parse its dump.")
 
 args = parser.parse_args()
 
@@ -17,22 +22,79 @@ first_day_current_month = dump_date.replace(day=1)
 start_date = (first_day_current_month - timedelta(days=1)).replace(day=1)
 end_date = start_date + timedelta(days=30)  # 30 days after the start
 
-# Define the scripts and their arguments
+workers = ["--workers", str(args.workers)]
+
+# Define the scripts, their arguments and the stages whose output they read.
+# The order is also the sequential run order, so it must stay topological.
 scripts = [
-    ["lang_links.py", args.language, args.dump_date, args.password],
-    ["page_cat_link.py", args.language, args.dump_date, args.password],
-    ["articles.py", args.language, args.dump_date, args.password],
-    ["categories.py", args.language, args.dump_date, args.password],
-    ["cat_links.py", args.language, args.dump_date, "--password", args.password],
-    ["populate_page_views_general.py", args.language, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"), args.password],
+    # Creates or migrates the tables before any loader touches them; each
+    # loader builds its own indexes once its bulk load is done
+    (["schema.py", args.password], []),
+    (["lang_links.py", args.language, args.dump_date, args.password] + workers, ["schema.py"]),
+    # articles + categories, and category_links + page_cat_link, each come from
+    # one pass over a shared dump
+    (["page_dump.py", args.language, args.dump_date, args.password] + workers, ["schema.py"]),
+    # Category titles in the categorylinks dump are resolved against the
+    # categories page_dump.py loads
+    (["categorylinks_dump.py", args.language, args.dump_date, args.password] + workers, ["page_dump.py"]),
+    (["category_closure.py", args.language, args.password], ["categorylinks_dump.py"]),
+    (["populate_page_views_general.py", args.language, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"), args.password, "--streaming"],
+     ["page_dump.py"]),
+    (["category_sketches.py", args.language, args.password],
+     ["categorylinks_dump.py", "populate_page_views_general.py"]),
+    (["missing_articles.py", args.language, args.password],
+     ["page_dump.py", "lang_links.py", "populate_page_views_general.py"]),
+    # Invalidates the server's search cache, so it only runs once everything loaded
+    (["bump_dataset_version.py", args.password],
+     ["lang_links.py", "page_dump.py", "categorylinks_dump.py", "category_closure.py",
+      "populate_page_views_general.py", "category_sketches.py", "missing_articles.py"]),
 ]
 
-# Loop through each script and execute it
-# Run this script using this form: python add_language_to_db.py <lang> <yyyymmdd> <db_password>
-for script in scripts:
-    try:
-        print(f"Running: {' '.join(['python'] + script)}")
-        subprocess.run(["python"] + script, check=True)
-        print(f"Finished: {script[0]}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error occurred while running {script[0]}: {e}")
\ No newline at end of file
+
+def run_script(script):
+    print(f"Running: {' '.join(['python'] + script)}")
+    subprocess.run(["python"] + script, check=True)
+    print(f"Finished: {script[0]}")
+
+
+def run_stages(scripts, jobs):
+    """Run each script as soon as everything it depends on has finished.
+
+    A failed script is reported and everything that depends on it, directly or
+    not, is skipped; independent stages still run.
+    """
+    waiting = list(scripts)
+    done = set()
+    failed = set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while waiting or running:
+            skipped = False
+            for script, depends_on in list(waiting):
+                if failed.intersection(depends_on):
+                    print(f"Skipping {script[0]}: a stage it depends on failed")
+                    failed.add(script[0])
+                    waiting.remove((script, depends_on))
+                    skipped = True
+                elif done.issuperset(depends_on) and len(running) < jobs:
+                    running[executor.submit(run_script, script)] = script[0]
+                    waiting.remove((script, depends_on))
+
+            if not running:
+                if skipped:
+                    continue
+                raise RuntimeError(f"Unknown dependencies for: {[script[0] for script, _ in waiting]}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    done.add(name)
+                except subprocess.CalledProcessError as e:
+                    print(f"Error occurred while running {name}: {e}")
+                    failed.add(name)
+
+
+# Run this script using this form: python add_language_to_db.py <lang> <yyyymmdd> <db_password> [--jobs N] [--workers N]
+run_stages(scripts, args.jobs)
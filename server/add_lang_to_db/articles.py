@@ -1,10 +1,12 @@
 import psycopg2
-import re
-import gzip
 import requests
 import argparse
 from datetime import datetime
 import os
+from copy_loader import CopyLoader
+from dump_parser import iter_dump_rows
+from lang_links import resolve_link_targets, table_exists
+from schema import apply_schema
 
 def download_file(url, file_path):
     if os.path.exists(file_path):
@@ -18,40 +20,39 @@ def download_file(url, file_path):
                     file.write(chunk)
         print("Download completed.")
 
-def process_dump(dump_file_path, lang, conn, cur):
-    insert_pattern = re.compile(
-        r"\((\d+),(\d+),'([^']+)',(\d+),\d+,\d+\.\d+,'[^']+','[^']+',\d+,(\d+),'wikitext',NULL\)"
-    )
-
-    with gzip.open(dump_file_path, 'rt', encoding='utf-8') as f:
-        for line in f:
-            if line.startswith('INSERT INTO `page`'):
-                matches = insert_pattern.findall(line)
-                for match in matches:
-                    page_id = int(match[0])
-                    namespace = int(match[1])
-                    page_title = match[2]
-                    is_redirect = int(match[3])
-                    page_length = int(match[4])
-
-                    # Skip if it's a list article or disambiguation page
-                    if namespace == 0 and is_redirect == 0:  # Only main namespace articles that are not redirects
-                        if "רשימ" in page_title or "פירושונים" in page_title:
-                            continue
-
-                        # Insert the article into the database
-                        cur.execute(
-                            "INSERT INTO articles (page_id, title, length, language) VALUES (%s, %s, %s, %s) ON CONFLICT (page_id, language) DO NOTHING",
-                            (page_id, page_title, page_length, lang)
-                        )
-
-    conn.commit()
+def is_article(row):
+    # Only main namespace articles that are not redirects, skipping list
+    # articles and disambiguation pages
+    page_id, namespace, page_title, is_redirect, page_length = row
+    if namespace != 0 or is_redirect != 0:
+        return False
+    return "רשימ" not in page_title and "פירושונים" not in page_title
+
+def open_loader(conn):
+    return CopyLoader(conn, 'articles', ('page_id', 'title', 'length', 'language'),
+                      conflict='(page_id, language)')
+
+def resolve_links_into(cur, lang):
+    # Point langlinks from other languages at the articles just loaded
+    if table_exists(cur, 'lang_links'):
+        print(f"Resolved {resolve_link_targets(cur, to_lang=lang)} link targets")
+        cur.connection.commit()
+
+def process_dump(dump_file_path, lang, conn, cur, workers=1):
+    loader = open_loader(conn)
+    with loader:
+        # page_id, page_namespace, page_title, page_is_redirect, page_len
+        rows = iter_dump_rows(dump_file_path, 'page', (0, 1, 2, 3, 9), row_filter=is_article, workers=workers)
+        for page_id, namespace, page_title, is_redirect, page_length in rows:
+            # Queue the article for the next COPY batch
+            loader.add((page_id, page_title, page_length, lang))
 
 def main():
     parser = argparse.ArgumentParser(description="Process Wikipedia dump files.")
     parser.add_argument("lang", help="Language shortcut (e.g., 'en' for English, 'fr' for French)")
     parser.add_argument("date", help="Date of the dump file (YYYYMMDD format)")
     parser.add_argument("db_password", help="Database password")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse the dump")
     args = parser.parse_args()
 
     # Validate date format
@@ -72,21 +73,12 @@ def main():
     conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.db_password}")
     cur = conn.cursor()
 
-    # Create the articles table if it doesn't exist, including the language column
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS articles (
-            page_id INTEGER,
-            title TEXT,
-            length INTEGER,
-            language VARCHAR(2),
-            PRIMARY KEY (page_id, language)
-        );
-    """)
-    conn.commit()
+    apply_schema(conn)
 
     # Process the dump file
     print("Processing the dump file...")
-    process_dump(dump_file_path, args.lang, conn, cur)
+    process_dump(dump_file_path, args.lang, conn, cur, args.workers)
+    resolve_links_into(cur, args.lang)
 
     # Close the database connection
     cur.close()
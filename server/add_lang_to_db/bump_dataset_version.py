@@ -0,0 +1,37 @@
+import psycopg2
+import argparse
+from schema import apply_schema
+
+
+def bump_version(conn, cur):
+    cur.execute("""
+        INSERT INTO dataset_version (version) VALUES (1)
+        ON CONFLICT (id) DO UPDATE
+        SET version = dataset_version.version + 1, updated_at = now()
+        RETURNING version
+    """)
+    version = cur.fetchone()[0]
+    conn.commit()
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mark the data as changed so the server stops serving cached search results.")
+    parser.add_argument("db_password", help="Database password")
+    args = parser.parse_args()
+
+    # PostgreSQL connection details
+    conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.db_password}")
+    cur = conn.cursor()
+
+    apply_schema(conn)
+    print(f"Dataset version is now {bump_version(conn, cur)}")
+
+    # Close the database connection
+    cur.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
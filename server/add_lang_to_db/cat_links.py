@@ -1,11 +1,17 @@
 import psycopg2
-import re
-import gzip
 import requests
 import argparse
+import os
 from datetime import datetime
+from copy_loader import CopyLoader
+from dump_parser import iter_dump_rows
+from schema import apply_schema, create_indexes, require_categories
 
 def download_file(url, file_path):
+    # page_cat_link.py reads the same categorylinks dump, so reuse it if it's already here
+    if os.path.exists(file_path):
+        print(f"The file {file_path} already exists. Skipping download.")
+        return
     print(f"Downloading the file from {url}...")
     response = requests.get(url, stream=True)
     with open(file_path, 'wb') as file:
@@ -14,23 +20,38 @@ def download_file(url, file_path):
                 file.write(chunk)
     print("Download completed.")
 
-def parse_insert_values(values_str):
-    values = []
-    current_value = []
-    in_quotes = False
-    for char in values_str:
-        if char == "'" and (not current_value or current_value[-1] != '\\'):
-            in_quotes = not in_quotes
-        elif char == ',' and not in_quotes:
-            values.append(''.join(current_value).strip("'"))
-            current_value = []
-        else:
-            current_value.append(char)
-    if current_value:
-        values.append(''.join(current_value).strip("'"))
-    return values
-
-def process_dump(lang, date, db_params):
+def is_subcat(row):
+    return row[2] == 'subcat'
+
+def open_loader(conn):
+    # The dump names the parent by title, so links are staged as they come and
+    # resolve_links turns the titles into category ids in one join
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS category_links_by_title (
+                child_id INTEGER,
+                parent_title TEXT,
+                language TEXT
+            );
+        """)
+    conn.commit()
+    return CopyLoader(conn, 'category_links_by_title', ('child_id', 'parent_title', 'language'))
+
+def resolve_links(conn):
+    # Links to a parent without a category page have no id and are dropped;
+    # the search could never reach them
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO category_links (parent_id, child_id, language)
+            SELECT parent.category_id, s.child_id, s.language
+            FROM category_links_by_title s
+            JOIN categories parent ON parent.language = s.language AND parent.category_title = s.parent_title
+        """)
+        print(f"Resolved {cur.rowcount} category links")
+        cur.execute("DROP TABLE category_links_by_title")
+    conn.commit()
+
+def process_dump(lang, date, db_params, workers=1):
     # Construct URL and file path
     url = f'https://mirror.accum.se/mirror/wikimedia.org/dumps/{lang}wiki/{date}/{lang}wiki-{date}-categorylinks.sql.gz'
     dump_file_path = f'{lang}wiki-{date}-categorylinks.sql.gz'
@@ -42,35 +63,17 @@ def process_dump(lang, date, db_params):
     conn = psycopg2.connect(**db_params)
     cur = conn.cursor()
 
-    # Create table if it doesn't exist
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS category_links (
-        subcategory INTEGER,
-        parent_category TEXT,
-        language VARCHAR(2)
-    );
-    """)
-    conn.commit()
+    apply_schema(conn)
+    require_categories(cur, lang)
 
-    # Regex to match INSERT statements
-    insert_stmt_re = re.compile(r"INSERT INTO `categorylinks` VALUES (.*);")
-
-    with gzip.open(dump_file_path, 'rt', encoding='utf-8', errors='replace') as file:
-        for line in file:
-            match = insert_stmt_re.search(line)
-            if match:
-                values_str = match.group(1)
-                tuples = re.split(r'\),\s*\(', values_str.strip('()'))
-
-                for tuple_str in tuples:
-                    parsed_values = parse_insert_values(tuple_str)
-                    if len(parsed_values) == 7 and parsed_values[6] == 'subcat':
-                        cl_from, cl_to = parsed_values[0], parsed_values[1]
-                        cur.execute("""
-                            INSERT INTO category_links (subcategory, parent_category, language)
-                            VALUES (%s, %s, %s)
-                        """, (cl_from, cl_to, lang))
-        conn.commit()
+    loader = open_loader(conn)
+    with loader:
+        # cl_from, cl_to, cl_type
+        rows = iter_dump_rows(dump_file_path, 'categorylinks', (0, 1, 6), row_filter=is_subcat, workers=workers)
+        for cl_from, cl_to, cl_type in rows:
+            loader.add((cl_from, cl_to, lang))
+    resolve_links(conn)
+    create_indexes(conn, ['category_links'])
 
     # Close the database connection
     cur.close()
@@ -87,6 +90,7 @@ if __name__ == "__main__":
     parser.add_argument("--password", required=True, help="Database password")
     parser.add_argument("--host", default="localhost", help="Database host")
     parser.add_argument("--port", default="5432", help="Database port")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse the dump")
 
     args = parser.parse_args()
 
@@ -104,4 +108,4 @@ if __name__ == "__main__":
         "port": args.port
     }
 
-    process_dump(args.lang, args.date, db_params)
\ No newline at end of file
+    process_dump(args.lang, args.date, db_params, args.workers)
\ No newline at end of file
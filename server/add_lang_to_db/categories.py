@@ -1,12 +1,18 @@
 import psycopg2
-import re
-import gzip
 import requests
 import argparse
+import os
 from datetime import datetime
+from copy_loader import CopyLoader
+from dump_parser import iter_dump_rows
+from schema import apply_schema, create_indexes
 
 
 def download_file(url, file_path):
+    # articles.py reads the same page dump, so reuse it if it's already here
+    if os.path.exists(file_path):
+        print(f"The file {file_path} already exists. Skipping download.")
+        return
     print(f"Downloading the file from {url}...")
     response = requests.get(url, stream=True)
     with open(file_path, 'wb') as file:
@@ -16,44 +22,21 @@ def download_file(url, file_path):
     print("Download completed.")
 
 
-def parse_insert_values(values_str):
-    values = []
-    current_value = []
-    in_quotes = False
-    for char in values_str:
-        if char == "'" and (not current_value or current_value[-1] != '\\'):
-            in_quotes = not in_quotes
-        elif char == ',' and not in_quotes:
-            values.append(''.join(current_value).strip("'"))
-            current_value = []
-        else:
-            current_value.append(char)
-    if current_value:
-        values.append(''.join(current_value).strip("'"))
-    return values
-
-
-def process_dump(dump_file_path, lang, cur):
-    insert_stmt_re = re.compile(r"INSERT INTO `page` VALUES (.*);")
-
-    with gzip.open(dump_file_path, 'rt', encoding='utf-8', errors='replace') as file:
-        for line in file:
-            match = insert_stmt_re.search(line)
-            if match:
-                values_str = match.group(1)
-                tuples = re.split(r'\),\s*\(', values_str.strip('()'))
-
-                for tuple_str in tuples:
-                    parsed_values = parse_insert_values(tuple_str)
-                    if len(parsed_values) >= 3 and parsed_values[1] == '14':  # Check if it's a category (namespace 14)
-                        page_id, page_title = parsed_values[0], parsed_values[2]
-                        print(f"Inserting category: {page_id}, {page_title}, language: '{lang}'")
-                        cur.execute("""
-                            INSERT INTO categories (category_id, category_title, language)
-                            VALUES (%s, %s, %s)
-                            ON CONFLICT (category_id) DO NOTHING
-                        """, (page_id, page_title, lang))
-        cur.connection.commit()
+def is_category(row):
+    return row[1] == 14  # Category namespace
+
+
+def open_loader(conn):
+    return CopyLoader(conn, 'categories', ('category_id', 'category_title', 'language'),
+                      conflict='(category_id, language)')
+
+
+def process_dump(dump_file_path, lang, cur, workers=1):
+    loader = open_loader(cur.connection)
+    with loader:
+        rows = iter_dump_rows(dump_file_path, 'page', (0, 1, 2), row_filter=is_category, workers=workers)
+        for page_id, namespace, page_title in rows:
+            loader.add((page_id, page_title, lang))
 
 
 def main():
@@ -61,6 +44,7 @@ def main():
     parser.add_argument("lang", help="Language shortcut (e.g., 'en' for English, 'fr' for French)")
     parser.add_argument("date", help="Date of the dump file (YYYYMMDD format)")
     parser.add_argument("password", help="PostgreSQL password")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse the dump")
     args = parser.parse_args()
 
     # Validate date format
@@ -81,18 +65,11 @@ def main():
     conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.password}")
     cur = conn.cursor()
 
-    # Create table if it doesn't exist
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS categories (
-        category_id INTEGER PRIMARY KEY,
-        category_title TEXT,
-        language VARCHAR(2)
-    );
-    """)
-    conn.commit()
+    apply_schema(conn)
 
     # Process the dump file
-    process_dump(dump_file_path, args.lang, cur)
+    process_dump(dump_file_path, args.lang, cur, args.workers)
+    create_indexes(conn, ['categories'])
 
     # Close the database connection
     cur.close()
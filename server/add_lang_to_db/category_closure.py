@@ -0,0 +1,74 @@
+import psycopg2
+import argparse
+from schema import apply_schema
+
+# Must be at least the deepest hierarchy the search endpoint asks for
+DEFAULT_MAX_DEPTH = 2
+
+
+def build_closure(lang, max_depth, conn, cur):
+    # Replace this language's closure rows in one transaction so searches never
+    # see a half-built table
+    cur.execute("DELETE FROM category_closure WHERE language = %s", (lang,))
+
+    # Every category is its own depth-0 descendant. The depth bound stops the
+    # recursion on cyclic category graphs and MIN(depth) collapses the
+    # duplicate paths those cycles (and diamonds) produce.
+    cur.execute("""
+        INSERT INTO category_closure (root_id, descendant_id, language, depth)
+        WITH RECURSIVE walk AS (
+            SELECT
+                c.category_id AS root_id,
+                c.category_id AS descendant_id,
+                0 AS depth
+            FROM categories c
+            WHERE c.language = %(lang)s
+
+            UNION ALL
+
+            SELECT
+                w.root_id,
+                cl.child_id,
+                w.depth + 1
+            FROM walk w
+            JOIN category_links cl
+                ON cl.parent_id = w.descendant_id AND cl.language = %(lang)s
+            WHERE w.depth < %(max_depth)s
+        )
+        SELECT root_id, descendant_id, %(lang)s, MIN(depth)
+        FROM walk
+        GROUP BY root_id, descendant_id
+    """, {'lang': lang, 'max_depth': max_depth})
+    print(f"Inserted {cur.rowcount} closure rows for '{lang}' (max depth {max_depth})")
+    conn.commit()
+
+    cur.execute("ANALYZE category_closure")
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the category closure table used by the search endpoint.")
+    parser.add_argument("lang", help="Language shortcut (e.g., 'en' for English)")
+    parser.add_argument("db_password", help="Database password")
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                        help="Deepest subcategory level to materialize")
+    args = parser.parse_args()
+
+    # PostgreSQL connection details
+    conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.db_password}")
+    cur = conn.cursor()
+
+    apply_schema(conn)
+
+    print("Building the category closure...")
+    build_closure(args.lang, args.max_depth, conn, cur)
+
+    # Close the database connection
+    cur.close()
+    conn.close()
+
+    print("Data processing completed.")
+
+
+if __name__ == "__main__":
+    main()
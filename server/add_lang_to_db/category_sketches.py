@@ -0,0 +1,113 @@
+import psycopg2
+import argparse
+from copy_loader import CopyLoader
+from schema import apply_schema
+
+# HyperLogLog with 2^10 one-byte registers: about 3% standard error. The
+# server's page_sketches.py merges and reads these, so the two must agree on
+# PRECISION and on the encoding below.
+PRECISION = 10
+REGISTERS = 1 << PRECISION
+_MASK = (1 << 64) - 1
+_RANK_BITS = 64 - PRECISION
+
+
+def splitmix64(value):
+    """Well-mixed 64-bit hash of an integer; page ids are dense, so they must be scrambled."""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+def add(registers, page_id):
+    hashed = splitmix64(page_id)
+    index = hashed >> _RANK_BITS
+    # Position of the first 1 bit after the index bits
+    rank = _RANK_BITS - (hashed & ((1 << _RANK_BITS) - 1)).bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+
+def encode(registers):
+    """Sparse (index << 6 | rank as little-endian 16-bit pairs) when smaller, else the raw registers.
+
+    Most categories hold a handful of pages, so most sketches are a few bytes;
+    the length tells the forms apart since a sparse one is always shorter.
+    """
+    entries = [(index << 6) | rank for index, rank in enumerate(registers) if rank]
+    if 2 * len(entries) < REGISTERS:
+        return b''.join(entry.to_bytes(2, 'little') for entry in entries)
+    return bytes(registers)
+
+
+def build_sketches(lang, conn):
+    """Replace lang's sketches with one per category over its viewed articles.
+
+    They cover exactly what the search's exact count counts, so the estimate
+    and the count agree up to the sketch error. The new sketches are built
+    in a temporary table and swapped in with one transaction, so searches
+    see the old set or the new one, never a mix.
+    """
+    with conn.cursor() as cur:
+        # Session-scoped, so it outlives the loader's commits
+        cur.execute("""
+            CREATE TEMP TABLE category_sketches_build
+            (LIKE category_sketches INCLUDING DEFAULTS)
+        """)
+    conn.commit()
+
+    loader = CopyLoader(conn, 'category_sketches_build', ('category_id', 'language', 'sketch'))
+    # Held across the loader's commits
+    with loader, conn.cursor(name='category_sketch_members', withhold=True) as members:
+        members.itersize = 100000
+        members.execute("""
+            SELECT pcl.category_id, pcl.page_id
+            FROM page_cat_link pcl
+            INNER JOIN articles a ON a.page_id = pcl.page_id AND a.language = pcl.language
+            WHERE pcl.language = %s AND a.view_count IS NOT NULL
+            ORDER BY pcl.category_id
+        """, (lang,))
+
+        current = None
+        registers = bytearray(REGISTERS)
+        for category_id, page_id in members:
+            if category_id != current:
+                if current is not None:
+                    # COPY reads bytea in hex form
+                    loader.add((current, lang, '\\x' + encode(registers).hex()))
+                current = category_id
+                registers = bytearray(REGISTERS)
+            add(registers, page_id)
+        if current is not None:
+            loader.add((current, lang, '\\x' + encode(registers).hex()))
+
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM category_sketches WHERE language = %s", (lang,))
+        cur.execute("INSERT INTO category_sketches SELECT * FROM category_sketches_build")
+        cur.execute("DROP TABLE category_sketches_build")
+    conn.commit()
+    print(f"Built {loader.rows_loaded} category sketches for '{lang}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the per-category page sketches the search uses for approximate counts.")
+    parser.add_argument("lang", help="Language shortcut (e.g., 'en' for English)")
+    parser.add_argument("db_password", help="Database password")
+    args = parser.parse_args()
+
+    # PostgreSQL connection details
+    conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.db_password}")
+
+    apply_schema(conn)
+    build_sketches(args.lang, conn)
+
+    # Close the database connection
+    conn.close()
+
+    print("Data processing completed.")
+
+
+if __name__ == "__main__":
+    main()
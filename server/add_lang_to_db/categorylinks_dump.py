@@ -0,0 +1,77 @@
+import psycopg2
+import argparse
+from datetime import datetime
+import cat_links
+import page_cat_link
+from dump_parser import AnyOf, fan_out, iter_dump_rows
+from schema import apply_schema, create_indexes, require_categories
+
+
+def process_dump(dump_file_path, lang, conn, workers=1):
+    """Load category_links and page_cat_link from a single pass over the categorylinks dump."""
+    subcat_loader = cat_links.open_loader(conn)
+    page_loader = page_cat_link.open_loader(conn)
+
+    def add_subcat(row):
+        subcat_loader.add((row[0], row[1], lang))
+
+    def add_page(row):
+        page_loader.add((row[0], row[1], lang))
+
+    with subcat_loader, page_loader:
+        # cl_from, cl_to, cl_type
+        rows = iter_dump_rows(dump_file_path, 'categorylinks', (0, 1, 6),
+                              row_filter=AnyOf(cat_links.is_subcat, page_cat_link.is_page), workers=workers)
+        fan_out(rows, [
+            (cat_links.is_subcat, add_subcat),
+            (page_cat_link.is_page, add_page),
+        ])
+    cat_links.resolve_links(conn)
+    page_cat_link.resolve_pages(conn)
+    page_cat_link.update_page_counts(conn, lang)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load category and page links from one pass over the categorylinks dump.")
+    parser.add_argument("lang", help="Language shortcut (e.g., 'en' for English)")
+    parser.add_argument("date", help="Date of the dump file (YYYYMMDD)")
+    parser.add_argument("db_password", help="Database password")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse the dump")
+    args = parser.parse_args()
+
+    # Validate date format
+    try:
+        datetime.strptime(args.date, "%Y%m%d")
+    except ValueError:
+        print("Incorrect date format. Please use YYYYMMDD.")
+        return
+
+    # Construct URL and file path
+    url = f'https://mirror.accum.se/mirror/wikimedia.org/dumps/{args.lang}wiki/{args.date}/{args.lang}wiki-{args.date}-categorylinks.sql.gz'
+    dump_file_path = f'{args.lang}wiki-{args.date}-categorylinks.sql.gz'
+
+    # Download the file
+    cat_links.download_file(url, dump_file_path)
+
+    # PostgreSQL connection details
+    conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.db_password}")
+    cur = conn.cursor()
+
+    apply_schema(conn)
+    require_categories(cur, args.lang)
+
+    # Process the dump file
+    print("Processing the dump file...")
+    process_dump(dump_file_path, args.lang, conn, args.workers)
+    create_indexes(conn, ['category_links', 'page_cat_link'])
+
+    # Close the database connection
+    cur.close()
+    conn.close()
+
+    print("Data processing completed.")
+
+
+if __name__ == "__main__":
+    main()
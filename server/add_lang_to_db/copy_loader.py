@@ -0,0 +1,98 @@
+import io
+
+# COPY text format: backslash, tab and line breaks must be escaped, NULL is \N
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def format_copy_value(value):
+    if value is None:
+        return '\\N'
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class CopyLoader:
+    """Stream rows into a table with COPY from an in-memory buffer.
+
+    Rows are buffered as COPY text and flushed every ``batch_size`` rows. Without
+    ``conflict`` they are copied straight into ``table``. With ``conflict`` (the
+    ON CONFLICT target, e.g. "(page_id, language)") they go through a temporary
+    staging table and are merged with INSERT ... ON CONFLICT DO NOTHING, so the
+    scripts keep the dedup semantics of their old per-row inserts.
+
+        with CopyLoader(conn, 'articles', ('page_id', 'title'), conflict='(page_id)') as loader:
+            loader.add((1, 'Title'))
+    """
+
+    def __init__(self, conn, table, columns, conflict=None, batch_size=100000):
+        self.conn = conn
+        self.table = table
+        self.columns = tuple(columns)
+        self.conflict = conflict
+        self.batch_size = batch_size
+        self.rows_loaded = 0
+        self._buffer = io.StringIO()
+        self._pending = 0
+        self._staging = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.conn.rollback()
+
+    def add(self, row):
+        self._buffer.write('\t'.join(format_copy_value(value) for value in row))
+        self._buffer.write('\n')
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def flush(self):
+        if not self._pending:
+            return
+        column_list = ', '.join(self.columns)
+        self._buffer.seek(0)
+        with self.conn.cursor() as cur:
+            if self.conflict is None:
+                cur.copy_expert(f"COPY {self.table} ({column_list}) FROM STDIN", self._buffer)
+            else:
+                staging = self._ensure_staging(cur)
+                cur.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN", self._buffer)
+                cur.execute(f"""
+                    INSERT INTO {self.table} ({column_list})
+                    SELECT {column_list} FROM {staging}
+                    ON CONFLICT {self.conflict} DO NOTHING
+                """)
+                cur.execute(f"TRUNCATE {staging}")
+        self.conn.commit()
+
+        self.rows_loaded += self._pending
+        print(f"Committed {self.rows_loaded} records to {self.table}")
+        self._buffer = io.StringIO()
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        if self._staging is not None:
+            with self.conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {self._staging}")
+            self.conn.commit()
+            self._staging = None
+
+    def _ensure_staging(self, cur):
+        if self._staging is None:
+            self._staging = f"{self.table}_staging"
+            # A TEMP table: private to this session, skips the WAL like any temporary
+            # table and has no indexes, so loading it costs little more than the COPY itself
+            cur.execute(f"""
+                CREATE TEMP TABLE IF NOT EXISTS {self._staging}
+                (LIKE {self.table} INCLUDING DEFAULTS)
+            """)
+        return self._staging
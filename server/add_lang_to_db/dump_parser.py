@@ -0,0 +1,196 @@
+import re
+import gzip
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# One token of a VALUES list: a quoted string (with MySQL backslash escapes), NULL
+# or a bare number, or the ')' that closes a row. Commas, '(' and the trailing
+# ';' match nothing and are skipped by finditer.
+_TOKEN_RE = re.compile(rb"""
+    '([^'\\]*(?:\\.[^'\\]*)*)'     # 1: quoted string
+  | ([^,();'\s]+)                  # 2: NULL or number
+  | (\))                           # 3: end of row
+""", re.VERBOSE | re.DOTALL)
+
+# One field of a row: group 1 holds a quoted string's body, group 2 a bare
+# value. Fields nobody asked for are matched without capturing.
+_FIELD = rb"(?:'([^'\\]*(?:\\.[^'\\]*)*)'|([^,()']*))"
+_SKIPPED_FIELD = rb"(?:'[^'\\]*(?:\\.[^'\\]*)*'|[^,()']*)"
+_row_patterns = {}
+
+_ESCAPE_RE = re.compile(rb"\\(.)", re.DOTALL)
+_ESCAPES = {
+    b'0': b'\x00', b'b': b'\b', b'n': b'\n', b'r': b'\r', b't': b'\t', b'Z': b'\x1a',
+}
+
+
+def _unescape(match):
+    char = match.group(1)
+    return _ESCAPES.get(char, char)
+
+
+def decode_string(raw):
+    if b'\\' in raw:
+        raw = _ESCAPE_RE.sub(_unescape, raw)
+    return raw.decode('utf-8', 'replace')
+
+
+def decode_value(quoted, bare):
+    if quoted:
+        return decode_string(quoted)
+    if not bare:
+        return ''
+    if bare == b'NULL':
+        return None
+    try:
+        return int(bare)
+    except ValueError:
+        return float(bare)
+
+
+def _row_pattern(arity, selected):
+    """Regex matching one whole row of ``arity`` fields, capturing only ``selected``."""
+    key = (arity, selected)
+    pattern = _row_patterns.get(key)
+    if pattern is None:
+        fields = [_FIELD if i in selected else _SKIPPED_FIELD for i in range(arity)]
+        pattern = re.compile(rb"\(" + rb",".join(fields) + rb"\)", re.DOTALL)
+        _row_patterns[key] = pattern
+    return pattern
+
+
+def _iter_token_rows(values, pos):
+    """Slow path: yield (row, end) per row by walking tokens, for rows of any shape."""
+    row = []
+    for match in _TOKEN_RE.finditer(values, pos):
+        quoted, bare, end = match.groups()
+        if end:
+            yield row, match.end()
+            row = []
+        else:
+            row.append((quoted or b'', bare or b''))
+
+
+def iter_values(values, pos=0, columns=None):
+    """Yield each row of a VALUES list (bytes, from ``pos``) as a tuple of str, int, float or None.
+
+    ``columns`` selects (and orders) the fields to return by index; only those
+    are decoded, which is most of the per-row cost. Rows are matched with a
+    regex built for the arity of the first row; if a row has a different shape
+    the rest of the statement falls back to the token-by-token scanner.
+    """
+    first = next(_iter_token_rows(values, pos), None)
+    if first is None:
+        return
+    arity = len(first[0])
+    whole_rows = columns is None
+    if whole_rows:
+        columns = tuple(range(arity))
+    end = pos
+    if max(columns) < arity:
+        selected = tuple(sorted(set(columns)))
+        pattern = _row_pattern(arity, selected)
+        offsets = [2 * selected.index(column) for column in columns]
+
+        # Rows are separated by exactly one comma; anything else means the
+        # fast pattern skipped text it could not match
+        for match in pattern.finditer(values, pos):
+            if match.start() - end > 1:
+                break
+            groups = match.groups()
+            yield tuple([decode_value(groups[i], groups[i + 1]) for i in offsets])
+            end = match.end()
+
+    if values[end:].strip() in (b';', b''):
+        return
+    for row, end in _iter_token_rows(values, end):
+        if whole_rows:
+            yield tuple([decode_value(*field) for field in row])
+        elif len(row) > max(columns):
+            yield tuple([decode_value(*row[i]) for i in columns])
+
+
+def _parse_chunk(lines, prefix_length, columns, row_filter):
+    """Worker entry point: parse a chunk of INSERT lines into a list of rows."""
+    rows = []
+    for line in lines:
+        rows.extend(iter_values(line, prefix_length, columns))
+    if row_filter is not None:
+        rows = [row for row in rows if row_filter(row)]
+    return rows
+
+
+def _iter_insert_chunks(dump_file_path, prefix, chunk_bytes):
+    chunk = []
+    size = 0
+    with gzip.open(dump_file_path, 'rb') as file:
+        for line in file:
+            if line.startswith(prefix):
+                chunk.append(line)
+                size += len(line)
+                if size >= chunk_bytes:
+                    yield chunk
+                    chunk = []
+                    size = 0
+    if chunk:
+        yield chunk
+
+
+def iter_dump_rows(dump_file_path, table, columns=None, row_filter=None, workers=1, chunk_bytes=4 << 20):
+    """Lazily yield the rows of every ``INSERT INTO `table` VALUES`` statement in a gzip dump.
+
+    ``row_filter`` drops rows before they are yielded. With ``workers`` > 1 the
+    INSERT lines are parsed in chunks of about ``chunk_bytes`` by a process pool
+    while this process decompresses; rows still come out in dump order, so
+    loaders commit exactly what a single-process run would. ``row_filter`` must
+    then be a module-level function so it can be sent to the workers.
+    """
+    prefix = f"INSERT INTO `{table}` VALUES ".encode()
+
+    if workers <= 1:
+        with gzip.open(dump_file_path, 'rb') as file:
+            for line in file:
+                if line.startswith(prefix):
+                    for row in iter_values(line, len(prefix), columns):
+                        if row_filter is None or row_filter(row):
+                            yield row
+        return
+
+    # Keep a couple of chunks queued per worker: enough to hide decompression,
+    # few enough that memory stays bounded however far the consumer lags
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in _iter_insert_chunks(dump_file_path, prefix, chunk_bytes):
+            pending.append(executor.submit(_parse_chunk, chunk, len(prefix), columns, row_filter))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class AnyOf:
+    """Row filter that keeps rows accepted by any of ``filters``.
+
+    A class rather than a closure so it can be sent to parse workers as long as
+    the filters themselves are module-level functions.
+    """
+
+    def __init__(self, *filters):
+        self.filters = filters
+
+    def __call__(self, row):
+        return any(row_filter(row) for row_filter in self.filters)
+
+
+def fan_out(rows, routes):
+    """Send each row to every ``(row_filter, sink)`` route whose filter accepts it.
+
+    Lets one decompress-and-parse pass over a dump feed several tables.
+    """
+    count = 0
+    for row in rows:
+        for row_filter, sink in routes:
+            if row_filter(row):
+                sink(row)
+        count += 1
+    return count
@@ -1,9 +1,10 @@
 import psycopg2
-import re
-import gzip
 import requests
 import argparse
 import os
+from copy_loader import CopyLoader
+from dump_parser import iter_dump_rows
+from schema import apply_schema, create_indexes
 
 def download_file(url, file_path):
     print(f"Downloading the file from {url}...")
@@ -14,39 +15,51 @@ def download_file(url, file_path):
                 file.write(chunk)
     print("Download completed.")
 
-def process_dump(dump_file_path, from_lang, cur, conn):
-    insert_re = re.compile(r"\((\d+),'(\w+)','([^']*)'\)")
-
-    with gzip.open(dump_file_path, "rt", encoding="utf-8", errors="replace") as file:
-        line_number = 0
-        for line in file:
-            line_number += 1
-
-            if line_number % 10000 == 0:
-                print(f"Processing line {line_number}")
-
-            try:
-                matches = insert_re.findall(line)
-                for match in matches:
-                    ll_from = int(match[0])
-                    ll_lang = match[1]
-                    ll_title = match[2]
-
-                    cur.execute("""
-                        INSERT INTO lang_links (ll_from_lang, ll_from, ll_lang, ll_title) 
-                        VALUES (%s, %s, %s, %s);
-                    """, (from_lang, ll_from, ll_lang, ll_title))
-                conn.commit()
-            except Exception as e:
-                print(f"Error processing line {line_number}: {line}")
-                print(f"Exception: {e}")
-                continue
+def normalize_title(title):
+    """Canonical title form shared with the page table: underscores, not spaces."""
+    return title.replace(' ', '_')
+
+def table_exists(cur, table_name):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table_name,))
+    return cur.fetchone()[0]
+
+def resolve_link_targets(cur, from_lang=None, to_lang=None):
+    """Fill ll_to with the target article's page_id for links whose target is loaded.
+
+    lang_links.py resolves the links it just loaded and articles.py resolves
+    links pointing into its language, so whichever runs last completes the pair.
+    """
+    conditions = ["ll.ll_to IS NULL"]
+    params = []
+    if from_lang:
+        conditions.append("ll.ll_from_lang = %s")
+        params.append(from_lang)
+    if to_lang:
+        conditions.append("ll.ll_lang = %s")
+        params.append(to_lang)
+
+    cur.execute(f"""
+        UPDATE lang_links ll
+        SET ll_to = a.page_id
+        FROM articles a
+        WHERE a.language = ll.ll_lang
+        AND a.title = ll.ll_title_norm
+        AND {' AND '.join(conditions)}
+    """, params)
+    return cur.rowcount
+
+def process_dump(dump_file_path, from_lang, cur, conn, workers=1):
+    loader = CopyLoader(conn, 'lang_links', ('ll_from_lang', 'll_from', 'll_lang', 'll_title', 'll_title_norm'))
+    with loader:
+        for ll_from, ll_lang, ll_title in iter_dump_rows(dump_file_path, 'langlinks', (0, 1, 2), workers=workers):
+            loader.add((from_lang, ll_from, ll_lang, ll_title, normalize_title(ll_title)))
 
 def main():
     parser = argparse.ArgumentParser(description="Process Wikipedia langlinks dump and load into PostgreSQL")
     parser.add_argument("language", help="Language shortcut (e.g., 'en' for English)")
     parser.add_argument("date", help="Dump file date (YYYYMMDD)")
     parser.add_argument("db_password", help="Database password")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse the dump")
     args = parser.parse_args()
 
     # Construct the URL and file path
@@ -63,19 +76,17 @@ def main():
     conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.db_password}")
     cur = conn.cursor()
 
-    # Create or modify the lang_links table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS lang_links (
-            ll_from_lang VARCHAR(10) NOT NULL,
-            ll_from INTEGER NOT NULL,
-            ll_lang VARCHAR(10) NOT NULL,
-            ll_title TEXT NOT NULL
-        );
-    """)
-    conn.commit()
+    apply_schema(conn)
 
     # Process the dump file
-    process_dump(dump_file_path, args.language, cur, conn)
+    process_dump(dump_file_path, args.language, cur, conn, args.workers)
+
+    # Index after loading so the bulk insert doesn't pay for index maintenance
+    create_indexes(conn, ['lang_links'])
+    print("Resolving link targets...")
+    if table_exists(cur, 'articles'):
+        print(f"Resolved {resolve_link_targets(cur, from_lang=args.language)} link targets")
+    conn.commit()
 
     # Close the database connection
     cur.close()
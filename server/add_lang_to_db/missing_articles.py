@@ -0,0 +1,81 @@
+import psycopg2
+import argparse
+from schema import apply_schema, create_indexes
+
+
+def get_languages(cur):
+    cur.execute("SELECT DISTINCT language FROM articles")
+    return [row[0] for row in cur.fetchall()]
+
+
+def build_missing_articles(source_lang, target_lang, conn, cur):
+    # Replace this pair's candidates in one transaction so searches never see
+    # a half-built set
+    cur.execute(
+        "DELETE FROM missing_articles WHERE language = %s AND target_language = %s",
+        (source_lang, target_lang)
+    )
+
+    # A source page is missing in the target language when no target-language
+    # page has a langlink resolving to it (lang_links.ll_to). This is the
+    # anti-join the create search used to run per request, done once per
+    # import instead.
+    cur.execute("""
+        INSERT INTO missing_articles
+            (page_id, language, target_language, title, length, view_count, len_views_ratio)
+        SELECT
+            a.page_id,
+            a.language,
+            %(target)s,
+            a.title,
+            a.length,
+            a.view_count,
+            a.len_views_ratio
+        FROM articles a
+        WHERE a.language = %(source)s
+        AND a.view_count IS NOT NULL
+        AND NOT EXISTS (
+            SELECT 1
+            FROM lang_links ll
+            WHERE ll.ll_from_lang = %(target)s
+            AND ll.ll_lang = %(source)s
+            AND ll.ll_to = a.page_id
+        )
+    """, {'source': source_lang, 'target': target_lang})
+    print(f"{source_lang} -> {target_lang}: {cur.rowcount} missing articles")
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute articles that exist in one language but are missing in another.")
+    parser.add_argument("lang", help="Language shortcut (e.g., 'he' for Hebrew); every pair involving it is rebuilt")
+    parser.add_argument("db_password", help="Database password")
+    args = parser.parse_args()
+
+    # PostgreSQL connection details
+    conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.db_password}")
+    cur = conn.cursor()
+
+    apply_schema(conn)
+
+    # A new language is both a source for the existing ones and a target they
+    # may be missing articles in
+    for other_lang in get_languages(cur):
+        if other_lang == args.lang:
+            continue
+        build_missing_articles(args.lang, other_lang, conn, cur)
+        build_missing_articles(other_lang, args.lang, conn, cur)
+
+    # Also refreshes the statistics for the new rows
+    create_indexes(conn, ['missing_articles'])
+
+    # Close the database connection
+    cur.close()
+    conn.close()
+
+    print("Data processing completed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 import psycopg2
-import re
-import gzip
 import requests
-import tempfile
 import argparse
+import os
 from datetime import datetime
+from copy_loader import CopyLoader
+from dump_parser import iter_dump_rows
+from schema import apply_schema, create_indexes, require_categories
 
 def download_file(url, file_path):
+    # cat_links.py reads the same categorylinks dump, so reuse it if it's already here
+    if os.path.exists(file_path):
+        print(f"The file {file_path} already exists. Skipping download.")
+        return
     print(f"Downloading the file from {url}...")
     response = requests.get(url, stream=True)
     with open(file_path, 'wb') as file:
@@ -15,73 +20,66 @@ def download_file(url, file_path):
                 file.write(chunk)
     print("Download completed.")
 
-def parse_insert_values(values_str):
-    values = []
-    current_value = []
-    in_quotes = False
-    for char in values_str:
-        if char == "'" and (not current_value or current_value[-1] != '\\'):
-            in_quotes = not in_quotes
-        elif char == ',' and not in_quotes:
-            values.append(''.join(current_value).strip("'"))
-            current_value = []
-        else:
-            current_value.append(char)
-    if current_value:
-        values.append(''.join(current_value).strip("'"))
-    return values
-
-def write_batch_to_tempfile(batch, temp_file):
-    temp_file.writelines(batch)
-
-def process_dump(dump_file_path, language, batch_size=10000):
-    insert_stmt_re = re.compile(r"INSERT INTO `categorylinks` VALUES (.*);")
-    batch = []
-
-    with gzip.open(dump_file_path, 'rt', encoding='utf-8', errors='replace') as file:
-        with tempfile.NamedTemporaryFile(mode='w+', encoding='utf-8', delete=False) as temp_file:
-            for line in file:
-                match = insert_stmt_re.search(line)
-                if match:
-                    values_str = match.group(1)
-                    tuples = re.split(r'\),\s*\(', values_str.strip('()'))
-
-                    for tuple_str in tuples:
-                        parsed_values = parse_insert_values(tuple_str)
-                        if len(parsed_values) == 7 and parsed_values[6] == 'page':
-                            cl_from, cl_to = parsed_values[0], parsed_values[1]
-                            cl_to_cleaned = cl_to.replace('\\', '')
-                            batch.append(f"{cl_from}\t{cl_to_cleaned}\t{language}\n")
-
-                            if len(batch) >= batch_size:
-                                write_batch_to_tempfile(batch, temp_file)
-                                batch = []
-
-            if batch:
-                write_batch_to_tempfile(batch, temp_file)
-
-    return temp_file.name
+def is_page(row):
+    return row[2] == 'page'
+
+def open_loader(conn, batch_size=100000):
+    # Staged by category title like cat_links.open_loader; resolve_pages maps the titles to ids
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS page_cat_link_by_title (
+                page_id INTEGER,
+                category_title TEXT,
+                language TEXT
+            );
+        """)
+    conn.commit()
+    return CopyLoader(conn, 'page_cat_link_by_title', ('page_id', 'category_title', 'language'), batch_size=batch_size)
+
+def resolve_pages(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO page_cat_link (page_id, category_id, language)
+            SELECT s.page_id, c.category_id, s.language
+            FROM page_cat_link_by_title s
+            JOIN categories c ON c.language = s.language AND c.category_title = s.category_title
+        """)
+        print(f"Resolved {cur.rowcount} page category links")
+        cur.execute("DROP TABLE page_cat_link_by_title")
+    conn.commit()
 
-def load_data_to_db(conn, cur, temp_file_name, batch_size=10000):
-    with open(temp_file_name, 'r', encoding='utf-8') as temp_file:
-        while True:
-            lines = temp_file.readlines(batch_size)
-            if not lines:
-                break
-            with tempfile.NamedTemporaryFile(mode='w+', encoding='utf-8', delete=False) as chunk_file:
-                chunk_file.writelines(lines)
-                chunk_file_name = chunk_file.name
+def update_page_counts(conn, language):
+    # The search sums these to estimate how many pages a category tree has
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE categories c
+            SET page_count = s.pages
+            FROM (
+                SELECT category_id, COUNT(*) AS pages
+                FROM page_cat_link
+                WHERE language = %s
+                GROUP BY category_id
+            ) s
+            WHERE c.language = %s AND c.category_id = s.category_id
+        """, (language, language))
+    conn.commit()
 
-            with open(chunk_file_name, 'r', encoding='utf-8') as chunk_file:
-                cur.copy_from(chunk_file, 'page_cat_link', columns=('page_id', 'category', 'language'), sep='\t')
-            conn.commit()
-            print(f"Committed {batch_size} records to the database")
+def process_dump(dump_file_path, language, conn, batch_size=100000, workers=1):
+    loader = open_loader(conn, batch_size)
+    with loader:
+        # cl_from, cl_to, cl_type
+        rows = iter_dump_rows(dump_file_path, 'categorylinks', (0, 1, 6), row_filter=is_page, workers=workers)
+        for cl_from, cl_to, cl_type in rows:
+            loader.add((cl_from, cl_to, language))
+    resolve_pages(conn)
+    update_page_counts(conn, language)
 
 def main():
     parser = argparse.ArgumentParser(description="Process Wikipedia dump and load into PostgreSQL")
     parser.add_argument("language", help="Language shortcut (e.g., 'en' for English)")
     parser.add_argument("date", help="Dump file date (YYYYMMDD)")
     parser.add_argument("db_password", help="Database password")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse the dump")
     args = parser.parse_args()
 
     # Construct the URL and file path
@@ -95,21 +93,12 @@ def main():
     conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.db_password}")
     cur = conn.cursor()
 
-    # Create the page_cat_link table with the 'language' column if it doesn't exist
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS page_cat_link (
-        page_id INTEGER,
-        category TEXT,
-        language TEXT
-    );
-    """)
-    conn.commit()
-
-    # Process the dump file
-    temp_file_name = process_dump(dump_file_path, args.language)
+    apply_schema(conn)
+    require_categories(cur, args.language)
 
-    # Load data from the temporary file into the database
-    load_data_to_db(conn, cur, temp_file_name)
+    # Process the dump file, streaming rows straight into the database
+    process_dump(dump_file_path, args.language, conn, workers=args.workers)
+    create_indexes(conn, ['page_cat_link'])
 
     # Close the database connection
     cur.close()
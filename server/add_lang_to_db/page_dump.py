@@ -0,0 +1,74 @@
+import psycopg2
+import argparse
+from datetime import datetime
+import articles
+import categories
+from dump_parser import AnyOf, fan_out, iter_dump_rows
+from schema import apply_schema, create_indexes
+
+
+def process_dump(dump_file_path, lang, conn, workers=1):
+    """Load articles and categories from a single pass over the page dump."""
+    article_loader = articles.open_loader(conn)
+    category_loader = categories.open_loader(conn)
+
+    def add_article(row):
+        page_id, namespace, page_title, is_redirect, page_length = row
+        article_loader.add((page_id, page_title, page_length, lang))
+
+    def add_category(row):
+        category_loader.add((row[0], row[2], lang))
+
+    with article_loader, category_loader:
+        # page_id, page_namespace, page_title, page_is_redirect, page_len
+        rows = iter_dump_rows(dump_file_path, 'page', (0, 1, 2, 3, 9),
+                              row_filter=AnyOf(articles.is_article, categories.is_category), workers=workers)
+        fan_out(rows, [
+            (articles.is_article, add_article),
+            (categories.is_category, add_category),
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load articles and categories from one pass over the page dump.")
+    parser.add_argument("lang", help="Language shortcut (e.g., 'en' for English, 'fr' for French)")
+    parser.add_argument("date", help="Date of the dump file (YYYYMMDD format)")
+    parser.add_argument("db_password", help="Database password")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse the dump")
+    args = parser.parse_args()
+
+    # Validate date format
+    try:
+        datetime.strptime(args.date, '%Y%m%d')
+    except ValueError:
+        print("Incorrect date format. Please use YYYYMMDD.")
+        return
+
+    # Construct URL and file path
+    url = f'https://mirror.accum.se/mirror/wikimedia.org/dumps/{args.lang}wiki/{args.date}/{args.lang}wiki-{args.date}-page.sql.gz'
+    dump_file_path = f'{args.lang}wiki-{args.date}-page.sql.gz'
+
+    # Download the file
+    articles.download_file(url, dump_file_path)
+
+    # PostgreSQL connection details
+    conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.db_password}")
+    cur = conn.cursor()
+
+    apply_schema(conn)
+
+    # Process the dump file
+    print("Processing the dump file...")
+    process_dump(dump_file_path, args.lang, conn, args.workers)
+    create_indexes(conn, ['categories'])
+    articles.resolve_links_into(cur, args.lang)
+
+    # Close the database connection
+    cur.close()
+    conn.close()
+
+    print("Data processing completed.")
+
+
+if __name__ == "__main__":
+    main()
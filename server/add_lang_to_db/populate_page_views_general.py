@@ -7,7 +7,11 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 import time
 import argparse
+import resource
+from array import array
 from datetime import datetime, timedelta
+from copy_loader import CopyLoader
+from schema import apply_schema, create_indexes
 
 # Database connection
 conn = None
@@ -17,6 +21,10 @@ cur = None
 pageviews = defaultdict(lambda: defaultdict(int))
 pageviews_lock = threading.Lock()
 
+# Hourly files downloaded and parsed at the same time. The streaming
+# aggregator holds one set of per-article arrays per worker thread.
+DOWNLOAD_WORKERS = 4
+
 
 def connect_to_database(db_password):
     global conn, cur
@@ -73,68 +81,210 @@ def update_shared_pageviews(local_pageviews):
                 pageviews[lang][article] += views
 
 
+# Staging column types for each way of identifying an article
+STAGING_KEY_TYPES = {'title': 'TEXT', 'page_id': 'INTEGER'}
+
+
+def bulk_update_view_counts(rows, key_column):
+    """Set articles.view_count from (language, key, views) rows with one set-based UPDATE.
+
+    The rows are streamed into a temporary staging table with COPY and joined
+    against articles on (language, key_column), instead of one UPDATE each.
+    """
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS view_counts_by_{key_column} (
+            language TEXT,
+            {key_column} {STAGING_KEY_TYPES[key_column]},
+            views BIGINT
+        );
+        TRUNCATE view_counts_by_{key_column};
+    """)
+    with CopyLoader(conn, f'view_counts_by_{key_column}', ('language', key_column, 'views')) as loader:
+        loader.add_many(rows)
+
+    cur.execute(f"ANALYZE view_counts_by_{key_column}")
+    cur.execute(f"""
+        UPDATE articles a
+        SET view_count = s.views
+        FROM view_counts_by_{key_column} s
+        WHERE a.language = s.language AND a.{key_column} = s.{key_column}
+    """)
+    print(f"Updated view counts of {cur.rowcount} articles")
+    conn.commit()
+
+
+def create_title_index():
+    # Only the title-keyed update needs it; it also serves title lookups elsewhere
+    print("Creating index on articles (language, title)...")
+    cur.execute("CREATE INDEX IF NOT EXISTS articles_language_title_idx ON articles (language, title)")
+    conn.commit()
+
+
 def update_database():
     print("Updating database...")
     with pageviews_lock:
-        for lang, lang_views in pageviews.items():
-            x = 0
-            for article, views in lang_views.items():
-                if x % 10000 == 0:
-                    print(f"{lang}: {x}")
-                x += 1
-                try:
-                    cur.execute(
-                        "UPDATE articles SET view_count = %s WHERE title = %s AND language = %s",
-                        (views, article, lang)
-                    )
-                except Exception as e:
-                    print(f"Error updating {article} for {lang}: {e}")
-        conn.commit()
+        bulk_update_view_counts(
+            ((lang, article, views) for lang, lang_views in pageviews.items() for article, views in lang_views.items()),
+            'title'
+        )
+
+
+class StreamingAggregator:
+    """Bounded-memory pageview totals for the articles already in the database.
+
+    Titles are resolved once, up front, to a dense per-language index; views
+    are summed into integer arrays over that index. Each worker thread owns its
+    own arrays, so files are aggregated without a shared lock and merged once
+    at the end. The threads come from one executor kept for the whole run, so
+    there are at most DOWNLOAD_WORKERS sets of arrays: memory depends on the
+    number of articles, not on how many distinct titles or days the date
+    range contains.
+    """
+
+    def __init__(self, languages):
+        self.page_ids = {}
+        self.title_index = {}
+        for lang in languages:
+            self.page_ids[lang], self.title_index[lang] = load_article_index(lang)
+        self.projects = {lang.encode(): lang for lang in languages}
+        self._local = threading.local()
+        self.partials = []
+
+    def _partial(self):
+        totals = getattr(self._local, 'totals', None)
+        if totals is None:
+            totals = {lang: array('q', bytes(8 * len(page_ids))) for lang, page_ids in self.page_ids.items()}
+            self._local.totals = totals
+            # list.append is atomic, and each thread registers exactly once
+            self.partials.append(totals)
+        return totals
+
+    def add_file(self, dump_file):
+        totals = self._partial()
+        projects = self.projects
+        with gzip.open(dump_file, 'rb') as f:
+            for line in f:
+                project, _, rest = line.partition(b' ')
+                lang = projects.get(project)
+                if lang is None:
+                    continue
+                parts = rest.split()
+                if len(parts) != 3:
+                    continue
+                index = self.title_index[lang].get(parts[0])
+                if index is not None:
+                    totals[lang][index] += int(parts[1])
+
+    def merge(self):
+        """Sum the per-thread partials into {lang: [(page_id, views), ...]} for viewed articles."""
+        merged = {}
+        for lang, page_ids in self.page_ids.items():
+            if not self.partials:
+                merged[lang] = []
+                continue
+            # Summed into the first partial, so the merge allocates no array of its own
+            totals = self.partials[0][lang]
+            for partial in self.partials[1:]:
+                for index, views in enumerate(partial[lang]):
+                    if views:
+                        totals[index] += views
+            merged[lang] = [(page_ids[index], views) for index, views in enumerate(totals) if views]
+        return merged
+
+
+def load_article_index(lang):
+    """Return the language's article page ids and a {title bytes: position} index into them."""
+    page_ids = array('q')
+    title_index = {}
+    # Named cursor so the titles stream from the server instead of being
+    # fetched into one big result list
+    with conn.cursor(name=f'article_titles_{lang}') as titles:
+        titles.itersize = 100000
+        titles.execute("SELECT page_id, title FROM articles WHERE language = %s", (lang,))
+        for page_id, title in titles:
+            title_index[title.encode('utf-8')] = len(page_ids)
+            page_ids.append(page_id)
+    conn.commit()
+    print(f"{lang}: indexed {len(page_ids)} article titles")
+    return page_ids, title_index
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def update_database_by_page_id(merged):
+    print("Updating database...")
+    bulk_update_view_counts(
+        ((lang, page_id, views) for lang, views_by_page in merged.items() for page_id, views in views_by_page),
+        'page_id'
+    )
+
+
+def remove_file(local_path):
+    start_time = time.time()
+    while True:
+        try:
+            os.remove(local_path)
+            break
+        except PermissionError:
+            if time.time() - start_time > 10:
+                print(f"Warning: Could not delete the file {local_path} after 10 seconds.")
+                break
+            time.sleep(1)
 
 
 def process_file(file_url, local_path, languages):
     if download_pageviews_file(file_url, local_path):
         local_pageviews = process_pageviews_dump(local_path, languages)
         update_shared_pageviews(local_pageviews)
+        remove_file(local_path)
 
-        start_time = time.time()
-        while True:
-            try:
-                os.remove(local_path)
-                break
-            except PermissionError:
-                if time.time() - start_time > 10:
-                    print(f"Warning: Could not delete the file {local_path} after 10 seconds.")
-                    break
-                time.sleep(1)
+
+def stream_file(file_url, local_path, aggregator):
+    if download_pageviews_file(file_url, local_path):
+        aggregator.add_file(local_path)
+        remove_file(local_path)
 
 
-def process_batch(start_date, end_date, languages):
+def process_batch(start_date, end_date, languages, streaming=False):
     base_url = "https://dumps.wikimedia.org/other/pageviews/"
     current_date = start_date
+    aggregator = StreamingAggregator(languages) if streaming else None
 
-    while current_date <= end_date:
-        year = current_date.year
-        month = current_date.month
-        day = current_date.day
+    # One pool for the whole range: its threads, and with them the streaming
+    # partials, are reused day after day instead of created anew for each
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        while current_date <= end_date:
+            year = current_date.year
+            month = current_date.month
+            day = current_date.day
 
-        local_dir = f"{year}-{month:02d}"
-        os.makedirs(local_dir, exist_ok=True)
+            local_dir = f"{year}-{month:02d}"
+            os.makedirs(local_dir, exist_ok=True)
 
-        tasks = []
-        with ThreadPoolExecutor(max_workers=4) as executor:
+            tasks = []
             for hour in range(24):
                 file_name = f"pageviews-{year}{month:02d}{day:02d}-{hour:02d}0000.gz"
                 file_url = f"{base_url}{year}/{year}-{month:02d}/{file_name}"
                 local_path = os.path.join(local_dir, file_name)
-                tasks.append(executor.submit(process_file, file_url, local_path, languages))
+                if streaming:
+                    tasks.append(executor.submit(stream_file, file_url, local_path, aggregator))
+                else:
+                    tasks.append(executor.submit(process_file, file_url, local_path, languages))
 
             for future in as_completed(tasks):
                 future.result()  # Ensure exceptions are raised
 
-        current_date += timedelta(days=1)
+            print(f"{current_date:%Y-%m-%d} done, peak RSS {peak_rss_mb():.0f} MB")
+            current_date += timedelta(days=1)
 
-    update_database()
+    if streaming:
+        update_database_by_page_id(aggregator.merge())
+    else:
+        update_database()
+    print(f"Peak RSS {peak_rss_mb():.0f} MB")
 
 
 def main():
@@ -145,6 +295,10 @@ def main():
     parser.add_argument("start_date", help="Start date in YYYY-MM-DD format")
     parser.add_argument("end_date", help="End date in YYYY-MM-DD format")
     parser.add_argument("db_password", help="Database password")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Aggregate into per-article arrays instead of a dict of every title seen")
+    parser.add_argument("--title-index", action="store_true",
+                        help="Create an index on articles (language, title) before updating")
 
     args = parser.parse_args()
 
@@ -152,8 +306,13 @@ def main():
     end_date = datetime.strptime(args.end_date, "%Y-%m-%d")
 
     connect_to_database(args.db_password)
+    apply_schema(conn)
+    if args.title_index:
+        create_title_index()
 
-    process_batch(start_date, end_date, args.languages)
+    process_batch(start_date, end_date, args.languages, args.streaming)
+    # Built once the view counts are in, so the update doesn't maintain it
+    create_indexes(conn, ['articles'])
 
     if conn:
         conn.close()
@@ -0,0 +1,296 @@
+import psycopg2
+import argparse
+
+# Wikipedia language codes go well past two letters ('simple', 'zh-yue',
+# 'be-tarask'), so every language column uses this type
+LANGUAGE_TYPE = "VARCHAR(20)"
+
+# Applied in order, each once, and recorded in schema_version. Never edit a
+# migration that has shipped; add a new one instead.
+MIGRATIONS = [
+    (1, "Create the ingestion and search tables", f"""
+        CREATE TABLE IF NOT EXISTS articles (
+            page_id INTEGER NOT NULL,
+            title TEXT,
+            length INTEGER,
+            language {LANGUAGE_TYPE} NOT NULL,
+            view_count INTEGER,
+            PRIMARY KEY (page_id, language)
+        );
+        CREATE TABLE IF NOT EXISTS categories (
+            category_id INTEGER NOT NULL,
+            category_title TEXT,
+            language {LANGUAGE_TYPE} NOT NULL,
+            PRIMARY KEY (category_id, language)
+        );
+        CREATE TABLE IF NOT EXISTS category_links (
+            subcategory INTEGER NOT NULL,
+            parent_category TEXT NOT NULL,
+            language {LANGUAGE_TYPE} NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS page_cat_link (
+            page_id INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            language {LANGUAGE_TYPE} NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS lang_links (
+            ll_from_lang {LANGUAGE_TYPE} NOT NULL,
+            ll_from INTEGER NOT NULL,
+            ll_lang {LANGUAGE_TYPE} NOT NULL,
+            ll_title TEXT NOT NULL,
+            -- The title in page-table form and, once the target language's
+            -- articles are loaded, the target page_id itself
+            ll_title_norm TEXT,
+            ll_to INTEGER
+        );
+        -- The primary key doubles as the lookup index for "descendants of
+        -- these roots in this language"
+        CREATE TABLE IF NOT EXISTS category_closure (
+            root_category TEXT NOT NULL,
+            descendant_category TEXT NOT NULL,
+            language {LANGUAGE_TYPE} NOT NULL,
+            depth SMALLINT NOT NULL,
+            PRIMARY KEY (language, root_category, descendant_category)
+        );
+        CREATE TABLE IF NOT EXISTS missing_articles (
+            page_id INTEGER NOT NULL,
+            language {LANGUAGE_TYPE} NOT NULL,
+            target_language {LANGUAGE_TYPE} NOT NULL,
+            title TEXT,
+            length INTEGER,
+            view_count INTEGER,
+            len_views_ratio DOUBLE PRECISION,
+            PRIMARY KEY (language, target_language, page_id)
+        );
+        -- Single-row table: the id column can only ever be TRUE
+        CREATE TABLE IF NOT EXISTS dataset_version (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """),
+    # Databases created by the scripts before this module existed already have
+    # some of the tables above, with narrower or missing columns. On a fresh
+    # database every statement here is a no-op on empty tables.
+    (2, "Bring tables created by older scripts in line with version 1", f"""
+        ALTER TABLE articles
+            ALTER COLUMN language TYPE {LANGUAGE_TYPE},
+            ADD COLUMN IF NOT EXISTS view_count INTEGER;
+        -- Category ids are page ids, which every wiki numbers on its own
+        ALTER TABLE categories
+            ALTER COLUMN language TYPE {LANGUAGE_TYPE},
+            ALTER COLUMN language SET NOT NULL,
+            DROP CONSTRAINT IF EXISTS categories_pkey,
+            ADD PRIMARY KEY (category_id, language);
+        ALTER TABLE category_links ALTER COLUMN language TYPE {LANGUAGE_TYPE};
+        ALTER TABLE page_cat_link ALTER COLUMN language TYPE {LANGUAGE_TYPE};
+        ALTER TABLE lang_links
+            ALTER COLUMN ll_from_lang TYPE {LANGUAGE_TYPE},
+            ALTER COLUMN ll_lang TYPE {LANGUAGE_TYPE},
+            ADD COLUMN IF NOT EXISTS ll_title_norm TEXT,
+            ADD COLUMN IF NOT EXISTS ll_to INTEGER;
+        UPDATE lang_links SET ll_title_norm = REPLACE(ll_title, ' ', '_') WHERE ll_title_norm IS NULL;
+        ALTER TABLE category_closure ALTER COLUMN language TYPE {LANGUAGE_TYPE};
+        ALTER TABLE missing_articles
+            ALTER COLUMN language TYPE {LANGUAGE_TYPE},
+            ALTER COLUMN target_language TYPE {LANGUAGE_TYPE};
+        DROP INDEX IF EXISTS missing_articles_ratio_idx;
+    """),
+    # Category titles live only in categories; the graph, page membership and
+    # closure refer to categories by id. Existing rows are converted by title,
+    # dropping links to categories that have no category page. The converted
+    # tables have no secondary indexes until their loaders or
+    # `schema.py --indexes` build them.
+    (3, "Key the category graph, page membership and closure by category id", f"""
+        DROP INDEX IF EXISTS category_links_parent_idx;
+        ALTER TABLE category_links RENAME TO category_links_by_title;
+        CREATE TABLE category_links (
+            parent_id INTEGER NOT NULL,
+            child_id INTEGER NOT NULL,
+            language {LANGUAGE_TYPE} NOT NULL
+        );
+        INSERT INTO category_links (parent_id, child_id, language)
+        SELECT parent.category_id, cl.subcategory, cl.language
+        FROM category_links_by_title cl
+        JOIN categories parent ON parent.language = cl.language AND parent.category_title = cl.parent_category;
+        DROP TABLE category_links_by_title;
+
+        DROP INDEX IF EXISTS page_cat_link_category_idx;
+        ALTER TABLE page_cat_link RENAME TO page_cat_link_by_title;
+        CREATE TABLE page_cat_link (
+            page_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            language {LANGUAGE_TYPE} NOT NULL
+        );
+        INSERT INTO page_cat_link (page_id, category_id, language)
+        SELECT pcl.page_id, c.category_id, pcl.language
+        FROM page_cat_link_by_title pcl
+        JOIN categories c ON c.language = pcl.language AND c.category_title = pcl.category;
+        DROP TABLE page_cat_link_by_title;
+
+        ALTER TABLE category_closure RENAME TO category_closure_by_title;
+        ALTER TABLE category_closure_by_title RENAME CONSTRAINT category_closure_pkey TO category_closure_by_title_pkey;
+        CREATE TABLE category_closure (
+            root_id INTEGER NOT NULL,
+            descendant_id INTEGER NOT NULL,
+            language {LANGUAGE_TYPE} NOT NULL,
+            depth SMALLINT NOT NULL,
+            PRIMARY KEY (language, root_id, descendant_id)
+        );
+        INSERT INTO category_closure (root_id, descendant_id, language, depth)
+        SELECT root.category_id, descendant.category_id, cc.language, cc.depth
+        FROM category_closure_by_title cc
+        JOIN categories root ON root.language = cc.language AND root.category_title = cc.root_category
+        JOIN categories descendant
+            ON descendant.language = cc.language AND descendant.category_title = cc.descendant_category;
+        DROP TABLE category_closure_by_title;
+    """),
+    # The searches rank by length/views ratio. Stored, it is computed once per
+    # view count update instead of for every candidate of every search, and
+    # can be indexed. page_count lets the search estimate a category tree's
+    # size before choosing how to query it.
+    (4, "Store the length/views ratio and per-category page counts", """
+        ALTER TABLE articles ADD COLUMN IF NOT EXISTS len_views_ratio DOUBLE PRECISION
+            GENERATED ALWAYS AS (ROUND(view_count::float / NULLIF(length, 0) * 100) / 100) STORED;
+        ALTER TABLE categories ADD COLUMN IF NOT EXISTS page_count INTEGER;
+        UPDATE categories c
+        SET page_count = s.pages
+        FROM (
+            SELECT category_id, language, COUNT(*) AS pages
+            FROM page_cat_link
+            GROUP BY category_id, language
+        ) s
+        WHERE c.category_id = s.category_id AND c.language = s.language;
+    """),
+    # One HyperLogLog sketch of viewed member pages per category, built by
+    # category_sketches.py; merged, they estimate a tree's distinct pages
+    # without counting them.
+    (5, "Add per-category page sketches", f"""
+        CREATE TABLE IF NOT EXISTS category_sketches (
+            category_id INTEGER NOT NULL,
+            language {LANGUAGE_TYPE} NOT NULL,
+            sketch BYTEA NOT NULL,
+            PRIMARY KEY (language, category_id)
+        );
+    """),
+]
+
+# Secondary indexes by table. They are not part of the migrations: the loading
+# scripts build them once their bulk load is done, so COPY never pays for
+# index maintenance.
+INDEXES = {
+    'categories': [
+        # Resolves category titles to ids, at ingest and for every search
+        "CREATE INDEX IF NOT EXISTS categories_title_idx ON categories (language, category_title)",
+    ],
+    'articles': [
+        # missing_articles.py selects a language's viewed articles
+        "CREATE INDEX IF NOT EXISTS articles_language_views_idx ON articles (language, view_count)",
+        # The expand search walks a language's articles best ratio first and
+        # stops after a page of matches
+        """CREATE INDEX IF NOT EXISTS articles_ratio_idx
+            ON articles (language, len_views_ratio DESC, page_id DESC) WHERE len_views_ratio IS NOT NULL""",
+    ],
+    'category_links': [
+        # The recursive step of category_closure.py walks parent -> subcategories
+        "CREATE INDEX IF NOT EXISTS category_links_parent_idx ON category_links (parent_id, language)",
+    ],
+    'page_cat_link': [
+        # The search queries join the category tree to its pages
+        "CREATE INDEX IF NOT EXISTS page_cat_link_category_idx ON page_cat_link (category_id, language)",
+        # Membership test of the top-K searches: is this page in any of these categories
+        "CREATE INDEX IF NOT EXISTS page_cat_link_page_idx ON page_cat_link (page_id, language, category_id)",
+    ],
+    'lang_links': [
+        "CREATE INDEX IF NOT EXISTS lang_links_title_idx ON lang_links (ll_lang, ll_title_norm)",
+        "CREATE INDEX IF NOT EXISTS lang_links_from_idx ON lang_links (ll_from_lang, ll_from)",
+        "CREATE INDEX IF NOT EXISTS lang_links_to_idx ON lang_links (ll_lang, ll_to)",
+    ],
+    'missing_articles': [
+        # Lets the create search read each page of the best candidates for a
+        # pair in (len_views_ratio, page_id) order
+        """CREATE INDEX IF NOT EXISTS missing_articles_keyset_idx
+            ON missing_articles (language, target_language, len_views_ratio DESC, page_id DESC)""",
+    ],
+}
+
+# Any constant works; it only has to be the same for every script
+_MIGRATION_LOCK = 20240720
+
+
+def current_version(cur):
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cur.fetchone()[0]
+
+
+def apply_schema(conn):
+    """Apply the migrations this database hasn't had yet and return its version.
+
+    Every script calls this before loading, so it runs standalone too. The
+    advisory lock serializes scripts the pipeline starts at the same time.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    conn.commit()
+
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (_MIGRATION_LOCK,))
+    version = current_version(cur)
+    for migration_version, description, sql in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        print(f"Applying schema version {migration_version}: {description}")
+        cur.execute(sql)
+        cur.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (migration_version, description))
+        version = migration_version
+    # Releases the lock; each migration is committed together with its record
+    conn.commit()
+    cur.close()
+    return version
+
+
+def require_categories(cur, lang):
+    """Fail unless lang's categories are in, since the categorylinks loaders resolve titles against them."""
+    cur.execute("SELECT EXISTS (SELECT 1 FROM categories WHERE language = %s)", (lang,))
+    if not cur.fetchone()[0]:
+        raise RuntimeError(f"No categories loaded for '{lang}'; run page_dump.py or categories.py first")
+
+
+def create_indexes(conn, tables):
+    """Build the secondary indexes of the given tables and refresh their statistics."""
+    cur = conn.cursor()
+    for table in tables:
+        print(f"Indexing {table}...")
+        for statement in INDEXES[table]:
+            cur.execute(statement)
+        cur.execute(f"ANALYZE {table}")
+        conn.commit()
+    cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or migrate the database schema used by the import scripts.")
+    parser.add_argument("db_password", help="Database password")
+    parser.add_argument("--indexes", nargs='*', choices=sorted(INDEXES), metavar="TABLE",
+                        help="Also build the secondary indexes of these tables (all of them if none are named)")
+    args = parser.parse_args()
+
+    # PostgreSQL connection details
+    conn = psycopg2.connect(f"dbname=test_db user=postgres password={args.db_password}")
+
+    print(f"Schema is at version {apply_schema(conn)}")
+    if args.indexes is not None:
+        create_indexes(conn, args.indexes or sorted(INDEXES))
+
+    # Close the database connection
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
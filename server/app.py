@@ -1,71 +1,117 @@
-import requests
-from flask import Flask, jsonify, request, redirect, session, make_response
+from flask import Flask, jsonify
 from flask_cors import CORS
-import psycopg2
 import os
-from requests_oauthlib import OAuth2Session
 import logging
-from flask_session import Session
-from flask import Flask, send_from_directory
+from flask import send_from_directory
 from dotenv import load_dotenv
-import time
 # Load environment variables from .env file
 load_dotenv()
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+from config import Config, CONFIGS
+import sessions
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__, static_folder='react_build')
-# Configure CORS properly
-CORS(app, 
-     resources={
-         r"/*": {
-             "origins": ["http://localhost:3001", "https://missingpedia.toolforge.org", "http://localhost:3000"],
-             "supports_credentials": True,
-             "allow_headers": ["Content-Type", "Authorization"],
-             "methods": ["GET", "POST", "OPTIONS"]
-         }
-     })
-app.secret_key = os.environ.get('SECRET_KEY', 1234321)
-app.config['SESSION_TYPE'] = 'filesystem'
-Session(app)
-# OAuth configuration from environment variables
-client_id = os.getenv('CLIENT_ID')
-client_secret = os.getenv('CLIENT_SECRET')
-redirect_uri = os.getenv('REDIRECT_URI')
-authorization_base_url = os.getenv('AUTHORIZATION_BASE_URL')
-token_url = os.getenv('TOKEN_URL')
-client_url = os.getenv('CLIENT_URL')
-
-# Register Blueprints
-from auth import auth_bp
-from articles import articles_bp
-from categories import categories_bp
-from watchlist import watchlist_bp
-
-app.register_blueprint(auth_bp)
-app.register_blueprint(articles_bp)
-app.register_blueprint(categories_bp)
-app.register_blueprint(watchlist_bp)
-
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    if path != "" and os.path.exists(app.static_folder + '/' + path):
-        return send_from_directory(app.static_folder, path)
+
+def configure_logging(level):
+    logging.basicConfig(level=level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', force=True)
+    if logging.getLogger().getEffectiveLevel() > logging.DEBUG:
+        # Per-request and per-connection chatter from the libraries
+        for name in ('werkzeug', 'urllib3', 'httpx', 'requests_oauthlib'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def create_app(config=None):
+    """Build the app from a config class, a name in config.CONFIGS, or a dict of overrides.
+
+    Everything a request needs (blueprints, session store and, if configured,
+    the database pool and category graphs) is set up here, so the first request after a worker
+    boots pays no import or connection cost.
+    """
+    if config is None or isinstance(config, str):
+        config = CONFIGS[config or os.getenv('APP_CONFIG', 'development')]
+
+    app = Flask(__name__, static_folder='react_build')
+    if isinstance(config, dict):
+        app.config.from_object(Config)
+        app.config.from_mapping(config)
     else:
-        return send_from_directory(app.static_folder, 'index.html')
+        app.config.from_object(config)
+    configure_logging(app.config['LOG_LEVEL'])
+
+    # Configure CORS properly
+    CORS(app,
+         resources={
+             r"/*": {
+                 "origins": ["http://localhost:3001", "https://missingpedia.toolforge.org", "http://localhost:3000"],
+                 "supports_credentials": True,
+                 "allow_headers": ["Content-Type", "Authorization"],
+                 "methods": ["GET", "POST", "OPTIONS"]
+             }
+         })
+    app.secret_key = app.config['SECRET_KEY']
+    sessions.init_app(app)
+
+    # Register Blueprints
+    from auth import auth_bp
+    from articles import articles_bp, category_graph
+    from categories import categories_bp
+    from watchlist import watchlist_bp
+    from wiki_api import api
+    import database
+
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(articles_bp)
+    app.register_blueprint(categories_bp)
+    app.register_blueprint(watchlist_bp)
+    # Return pooled DB connections at the end of every request
+    database.init_app(app)
+
+    if app.config['PRELOAD_DB_POOL']:
+        try:
+            database.get_pool()
+        except Exception as e:
+            # Keep serving the SPA; the pool is retried on the first query
+            logger.error(f'Could not open the database pool at startup: {e}')
+
+    if app.config['PRELOAD_CATEGORY_GRAPH']:
+        try:
+            with app.app_context():
+                category_graph.preload(database.get_db_connection())
+        except Exception as e:
+            # Graphs are built on first use instead
+            logger.error(f'Could not load the category graphs at startup: {e}')
+
+    @app.route('/api/db_pool_stats')
+    def db_pool_stats():
+        return jsonify(database.pool_stats())
+
+    @app.route('/api/wiki_api_stats')
+    def wiki_api_stats():
+        return jsonify(api.stats())
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if path != "" and os.path.exists(app.static_folder + '/' + path):
+            return send_from_directory(app.static_folder, path)
+        else:
+            return send_from_directory(app.static_folder, 'index.html')
+
+    @app.route('/<path:path>')
+    def serve_static(path):
+        return send_from_directory(app.static_folder, path)
 
+    # ...existing route definitions...
 
-@app.route('/<path:path>')
-def serve_static(path):
-    return send_from_directory(app.static_folder, path)
+    logger.info(f"App created (debug={app.config['DEBUG']}, log level {app.config['LOG_LEVEL']})")
+    return app
 
 
-# ...existing route definitions...
+# Module-level app for `python app.py`, `flask run` and the wsgi/asgi entry
+# points, which set APP_CONFIG=production before importing it
+app = create_app()
 
 if __name__ == '__main__':
     os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
     logger.info('Starting Flask app')
-    app.run(debug=True, port=3000)
+    app.run(debug=app.config['DEBUG'], host=app.config['HOST'], port=app.config['PORT'])
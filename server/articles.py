@@ -1,206 +1,487 @@
+import json
+import math
+import base64
 import logging
-from flask import Blueprint, request, jsonify
-from database import get_db_connection
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from psycopg2 import errors
+from database import get_db_connection, load_dataset_version
+from export import EXPORT_FORMATS, serialize
+from result_cache import SearchCache
+from category_graph import CategoryGraphService
+from page_sketches import estimate_union
 
 articles_bp = Blueprint('articles', __name__)
 logger = logging.getLogger(__name__)
 
+# How many subcategory levels below the requested categories are searched.
+# Expanded by category_graph in memory; with CATEGORY_GRAPH=0 it is read from
+# category_closure instead, which add_lang_to_db/category_closure.py must have
+# built to at least this depth.
+DEFAULT_CATEGORY_DEPTH = 2
+
+# Rows per page when the client does not pass page_size; these match the
+# fixed LIMITs the searches used to have
+DEFAULT_PAGE_SIZE = {'create': 20, 'expand': 100}
+MAX_PAGE_SIZE = 500
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 2000
+# Rows per FETCH while reading a search page. Each FETCH is its own statement
+# under the search's statement_timeout, so a timeout keeps what the earlier
+# ones read.
+PAGE_FETCH_SIZE = 100
+
+# Category trees whose categories hold at least this many pages (counting a
+# page once per category) are searched top-K: walk the ratio index and stop
+# after a page of matches. Smaller trees are joined in full and sorted.
+TOP_K_MIN_PAGES = 5000
+
+# Values of the search's count parameter. 'approximate' merges the
+# per-category sketches add_lang_to_db/category_sketches.py stores, a few
+# percent off; 'exact' counts the tree's pages.
+COUNT_MODES = ('approximate', 'exact', 'none')
+
+# Display names the client sends in its language pickers
+LANGUAGE_CODES = {'English': 'en', 'Hebrew': 'he'}
+# The create task finds this language's articles that are missing in the target
+SOURCE_LANGUAGE = 'en'
+
+# Responses only change when an import bumps the dataset version
+search_cache = SearchCache.from_env(version_loader=load_dataset_version)
+# Subcategory expansion; graphs are rebuilt when an import bumps the dataset version
+category_graph = CategoryGraphService.from_env(version_loader=load_dataset_version)
+
+@articles_bp.route('/api/search_cache_stats')
+def search_cache_stats():
+    return jsonify(search_cache.stats())
+
+
+@articles_bp.route('/api/category_graph_stats')
+def category_graph_stats():
+    """Memory held by the in-process category graphs, per language."""
+    return jsonify(category_graph.stats())
+
+
 @articles_bp.route('/api/search_categories', methods=['GET'])
 def search_categories():
     try:
         # Get the query parameters
-        categories = request.args.get('categories', '2010s_deaths').split(',')
+        categories = parse_categories(request.args.get('categories', '2010s_deaths'))
         task = request.args.get('task', 'expand')  # Default to 'create' if not provided
 
-        # Debugging: print the received parameters
-        print(f"Categories: {categories}")
-        print(f"Task: {task}")
+        logger.debug(f"Categories: {categories}, task: {task}")
+
+        lang = request_language(task)
+
+        try:
+            page_size = int(request.args.get('page_size', DEFAULT_PAGE_SIZE['create' if task == 'create' else 'expand']))
+            depth = int(request.args.get('depth', DEFAULT_CATEGORY_DEPTH))
+            after = request.args.get('after')
+            if after is not None:
+                after = decode_cursor(after)
+        except ValueError:
+            return jsonify({'error': 'Invalid page_size, depth or after cursor'}), 400
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        depth = max(0, min(depth, current_app.config['SEARCH_MAX_DEPTH']))
+        # An exact page count is as costly as a full join of the tree, so it is only run on request
+        count = request.args.get('count', 'approximate')
+        if count not in COUNT_MODES:
+            return jsonify({'error': f"Unsupported count, use one of: {', '.join(COUNT_MODES)}"}), 400
+
+        cache_key = search_cache.make_key(task, lang, categories, page_size=page_size, depth=depth, count=count,
+                                          after=request.args.get('after', ''))
+        response = search_cache.get(cache_key)
+        if response is not None:
+            return jsonify(response)
 
-        # Connect to the database
+        # Borrow a pooled connection; it is returned when the app context tears down
         conn = get_db_connection()
-        cur = conn.cursor()
+
+        # Create searches English categories, expand searches the target language's own
+        category_ids, truncated = category_graph.expand(conn, SOURCE_LANGUAGE if task == 'create' else lang,
+                                                        categories, depth,
+                                                        current_app.config['SEARCH_MAX_CATEGORIES'])
 
         # Depending on the task, call the appropriate function
-        if task == 'create':
-            print("Calling create_articles function")
-            # Call create_articles function here
-            return create_articles(conn, cur, categories)
-        else:
-            print("Calling expand_articles function")
-            lang = request.args.get('expandLanguage', 'en')
-            if lang == "Hebrew":
-                lang = "he"
-            else:
-                lang = 'en'
-            # Call expand_articles function here
-            return expand_articles(conn, cur, categories, lang)
+        with conn.cursor() as cur:
+            # Scoped to this transaction, so the pooled connection gets its default back
+            cur.execute("SET LOCAL statement_timeout = %s", (current_app.config['SEARCH_STATEMENT_TIMEOUT_MS'],))
+            try:
+                search = create_articles if task == 'create' else expand_articles
+                response = search(conn, cur, category_ids, lang, page_size=page_size, after=after, count=count)
+            except errors.QueryCanceled:
+                # The page query keeps its partial rows itself; this is a timeout before it ran
+                conn.rollback()
+                logger.warning(f"Search for {categories} ({task}, {lang}, depth {depth}) hit the statement timeout")
+                response = {'articles': [], 'distinct_pages_count': None,
+                            # Retrying from the same position resumes the search
+                            'next_cursor': request.args.get('after'),
+                            'timed_out': True, 'count_timed_out': count != 'none' and after is None}
+
+        response.update({
+            'depth': depth,
+            'categories_expanded': len(category_ids),
+            # Tells the client whether distinct_pages_count is an estimate
+            'count': count,
+            # The category budget cut the expansion short, so not every subcategory was searched
+            'truncated': truncated,
+        })
+        # A timeout depends on the load at the time, so let the next search try again
+        if not response['timed_out'] and not response['count_timed_out']:
+            search_cache.set(cache_key, response)
+        return jsonify(response)
 
     except Exception as e:
-        # Log the error message
-        print(f"Error in search_categories: {str(e)}")
+        logger.error(f"Error in search_categories: {e}", exc_info=True)
         return jsonify({'error': 'Internal Server Error', 'message': str(e)}), 500
 
 
-def create_articles(conn, cur, categories):
-    categories_placeholders = ', '.join(['%s'] * len(categories))
-
-    sql_query = f"""
-    WITH RECURSIVE CategoryHierarchy AS (
-        SELECT
-            c.category_id::text AS category_id,
-            c.category_title,
-            c.language,
-            0 AS depth
-        FROM
-            categories c
-        WHERE
-            c.category_title::text IN ({categories_placeholders})
-
-        UNION ALL
-
-        SELECT
-            cl.subcategory::text AS category_id,
-            c.category_title,
-            c.language,
-            ch.depth + 1 AS depth
-        FROM
-            CategoryHierarchy ch
-        JOIN
-            category_links cl ON ch.category_title::text = cl.parent_category::text AND ch.language = cl.language
-        JOIN
-            categories c ON cl.subcategory::text = c.category_id::text AND c.language = cl.language
-        WHERE
-            ch.depth < 2
-    ),
-
-    PagesOfInterest AS (
-        SELECT DISTINCT a.page_id, a.title, a.length, a.view_count,
-            ROUND(a.view_count::float / a.length * 100) / 100 AS len_views_ratio,
-            COUNT(*) OVER () AS distinct_page_count
+@articles_bp.route('/api/export_missing_articles', methods=['GET'])
+def export_missing_articles():
+    """Stream every missing article of a category tree as NDJSON or CSV.
+
+    Rows go from a server-side cursor straight into the response in chunks,
+    so memory stays flat however many rows the tree has. Not cached: exports
+    are rare and far larger than any search response.
+    """
+    categories = parse_categories(request.args.get('categories', ''))
+    # Resolved like the create search, so an export lists what that search pages through
+    lang = request_language('create')
+    export_format = request.args.get('format', 'ndjson')
+    if not categories:
+        return jsonify({'error': 'No categories provided'}), 400
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format, use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        depth = int(request.args.get('depth', DEFAULT_CATEGORY_DEPTH))
+    except ValueError:
+        return jsonify({'error': 'Invalid depth'}), 400
+    depth = max(0, min(depth, current_app.config['SEARCH_MAX_DEPTH']))
+
+    # Expanded before streaming starts, so the headers can report it
+    category_ids, truncated = category_graph.expand(get_db_connection(), SOURCE_LANGUAGE, categories, depth,
+                                                    current_app.config['SEARCH_MAX_CATEGORIES'])
+    timeout_ms = current_app.config['EXPORT_STATEMENT_TIMEOUT_MS']
+
+    def generate():
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                # Scoped to this transaction like the search's; each FETCH gets the full timeout
+                cur.execute("SET LOCAL statement_timeout = %s", (timeout_ms,))
+            with conn.cursor(name='export_missing_articles') as cur:
+                cur.itersize = EXPORT_BATCH_SIZE
+                cur.execute(missing_articles_sql(), [SOURCE_LANGUAGE, category_ids, lang])
+                yield from serialize(cur, export_format)
+        except errors.QueryCanceled:
+            # The headers are out; failing the stream tells the client the file is incomplete
+            logger.warning(f"Export for {categories} in {lang} hit the statement timeout")
+            raise
+        finally:
+            conn.rollback()
+
+    logger.info(f"Exporting missing articles for {categories} in {lang} as {export_format}")
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=missing_articles_{lang}.{export_format}'
+    response.headers['X-Categories-Expanded'] = str(len(category_ids))
+    response.headers['X-Categories-Truncated'] = 'true' if truncated else 'false'
+    return response
+
+
+def request_language(task):
+    """Language code of the request's language parameter for the task.
+
+    For create, the target_language the missing articles are missing in;
+    the source language, the client's initial selection, stands for the
+    default target. For expand, the language whose articles are listed.
+    """
+    if task == 'create':
+        lang = request.args.get('target_language', 'Hebrew')
+        lang = LANGUAGE_CODES.get(lang, lang)
+        return 'he' if lang == SOURCE_LANGUAGE else lang
+    return 'he' if request.args.get('expandLanguage', 'en') == 'Hebrew' else 'en'
+
+
+def parse_categories(value):
+    """The comma-separated category titles of a request, stripped, de-duplicated and sorted.
+
+    The same list is looked up and put in the cache key, so two spellings
+    of a query share an entry only if they search the same categories.
+    """
+    return sorted({category.strip() for category in value.split(',') if category.strip()})
+
+
+def encode_cursor(len_views_ratio, page_id):
+    """Opaque token for the position after the given row in (len_views_ratio, page_id) DESC order."""
+    return base64.urlsafe_b64encode(json.dumps([len_views_ratio, page_id]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        len_views_ratio, page_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    # Only what encode_cursor writes: a finite ratio and an integer page id
+    if (type(len_views_ratio) not in (int, float) or not math.isfinite(len_views_ratio)
+            or type(page_id) is not int):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return float(len_views_ratio), page_id
+
+
+def category_pages_sql():
+    """CTE selecting the distinct pages in the given categories.
+
+    Parameters: language, then the list of category ids, already expanded to
+    their subcategories by category_graph.
+    """
+    return """
+    WITH CategoryPages AS (
+        SELECT DISTINCT pcl.page_id
         FROM page_cat_link pcl
-        INNER JOIN articles a ON pcl.page_id = a.page_id
-        WHERE a.language = 'en'
-        AND (pcl.category, pcl.language) IN (SELECT category_title, language FROM CategoryHierarchy)
-        AND a.view_count IS NOT NULL
-        LIMIT 170000
+        WHERE pcl.language = %s
+        AND pcl.category_id = ANY(%s::integer[])
     )
+    """
+
+
+def count_category_pages(cur, category_ids, language):
+    """Number of viewed articles in the category tree, shown with the first page of results.
+
+    None if counting ran past the statement timeout; the page already fetched
+    is still returned.
+    """
+    try:
+        cur.execute(category_pages_sql() + """
+        SELECT COUNT(*)
+        FROM CategoryPages cp
+        INNER JOIN articles a ON a.page_id = cp.page_id AND a.language = %s
+        WHERE a.view_count IS NOT NULL
+        """, [language, category_ids, language])
+    except errors.QueryCanceled:
+        cur.connection.rollback()
+        logger.warning(f"Counting the pages of {len(category_ids)} categories hit the statement timeout")
+        return None
+    return cur.fetchone()[0]
+
+
+def estimate_distinct_pages(cur, category_ids, language):
+    """Approximate number of viewed articles in the category tree, from the stored sketches.
+
+    A page in several of the categories is counted once, like the exact
+    count. Falls back to counting when none of the categories has a sketch,
+    which is also what a language imported before the sketches existed looks like.
+    """
+    cur.execute("""
+        SELECT sketch
+        FROM category_sketches
+        WHERE language = %s AND category_id = ANY(%s::integer[])
+    """, (language, category_ids))
+    sketches = [row[0] for row in cur.fetchall()]
+    if not sketches:
+        return count_category_pages(cur, category_ids, language) if category_ids else 0
+    return estimate_union(sketches)
+
+
+def tree_page_count(cur, category_ids, language, count):
+    """The category tree's page count in the requested count mode; None for 'none' or a timeout."""
+    if count == 'exact':
+        return count_category_pages(cur, category_ids, language)
+    if count == 'approximate':
+        return estimate_distinct_pages(cur, category_ids, language)
+    return None
 
-    SELECT *
-    FROM PagesOfInterest tpi
-    WHERE NOT EXISTS (
+
+def keyset_condition(after, ratio_column, page_id_column):
+    """SQL and parameters that start a (ratio, page_id) DESC scan after the cursor position."""
+    if after is None:
+        return '', []
+    return f"AND ({ratio_column}, {page_id_column}) < (%s, %s)", list(after)
+
+
+def page_in_categories_sql(page_id_column, language_column):
+    """EXISTS test for a page being in any of the categories; one parameter, the list of category ids."""
+    return f"""EXISTS (
         SELECT 1
-        FROM lang_links ll
-        WHERE ll.ll_lang = 'en' AND REPLACE(tpi.title, '_', ' ') = ll.ll_title
-    )
-    ORDER BY len_views_ratio DESC
-    LIMIT 20;
+        FROM page_cat_link pcl
+        WHERE pcl.page_id = {page_id_column} AND pcl.language = {language_column}
+        AND pcl.category_id = ANY(%s::integer[])
+    )"""
+
+
+def estimate_category_pages(cur, category_ids, language):
+    """Upper bound on the pages in the categories, from the per-category counts the import stores.
+
+    A page in several of the categories is counted once for each.
     """
+    cur.execute("""
+        SELECT COALESCE(SUM(page_count), 0)
+        FROM categories
+        WHERE language = %s AND category_id = ANY(%s::integer[])
+    """, (language, category_ids))
+    return cur.fetchone()[0]
 
-    cur.execute(sql_query, categories)
-    results = cur.fetchall()
 
-    articles = {}
-    distinct_pages_count = results[0][5] if results else 0  # Getting the distinct pages count from the first row
+def use_top_k(cur, category_ids, language):
+    """Whether to walk the ratio index and stop after a page of hits instead of joining the whole tree.
+
+    The walk reads about page_size * (all candidates / tree pages) index
+    entries, so it wins for broad trees and loses badly for narrow ones.
+    """
+    return estimate_category_pages(cur, category_ids, language) >= TOP_K_MIN_PAGES
+
+
+def missing_articles_sql(keyset=''):
+    """Articles of the category tree missing in a target language, best ratio first.
+
+    Parameters: as category_pages_sql, the target language, then the keyset
+    parameters if ``keyset`` is given.
+    """
+    return category_pages_sql() + f"""
+    SELECT ma.page_id, ma.title, ma.length, ma.view_count, ma.len_views_ratio
+    FROM missing_articles ma
+    INNER JOIN CategoryPages cp ON cp.page_id = ma.page_id
+    WHERE ma.language = 'en' AND ma.target_language = %s
+    AND ma.len_views_ratio IS NOT NULL
+    {keyset}
+    ORDER BY ma.len_views_ratio DESC, ma.page_id DESC
+    """
+
+
+def missing_articles_top_k_sql(keyset=''):
+    """missing_articles_sql for broad trees: walks missing_articles_keyset_idx and stops at the LIMIT.
+
+    Parameters: the target language, the keyset parameters if ``keyset`` is
+    given, then the list of category ids.
+    """
+    return f"""
+    SELECT ma.page_id, ma.title, ma.length, ma.view_count, ma.len_views_ratio
+    FROM missing_articles ma
+    WHERE ma.language = 'en' AND ma.target_language = %s
+    AND ma.len_views_ratio IS NOT NULL
+    {keyset}
+    AND {page_in_categories_sql('ma.page_id', 'ma.language')}
+    ORDER BY ma.len_views_ratio DESC, ma.page_id DESC
+    """
 
-    for row in results:
-        page_id = row[0]
-        if page_id not in articles:
-            articles[page_id] = {
-                'source_id': page_id,
-                'source_title': row[1],
-                'source_length': row[2],
-                'source_views': row[3],
-                'len_views_ratio': row[4],
-                'source_language': 'en',
-                'other_languages': []  # No other languages for this case
-            }
 
+def create_articles(conn, cur, category_ids, target_language,
+                    page_size=DEFAULT_PAGE_SIZE['create'], after=None, count='approximate'):
+    """One page of English articles missing in target_language, best length/views ratio first.
+
+    Pages are keyset-paginated on (len_views_ratio, page_id): pass the
+    response's next_cursor as ``after`` for the next page. Rows stream from a
+    server-side cursor, so memory is bounded by page_size however large the
+    category tree is. The tree's page count is only computed for the first
+    page, in the ``count`` mode (see COUNT_MODES).
+
+    If the statement timeout stops the page query, the rows read so far are
+    returned with ``timed_out`` set and a next_cursor that resumes after
+    them; None only if the first page timed out before its first row, so
+    the search has to be retried. ``count_timed_out`` flags a count lost to
+    the timeout while the page itself is complete.
+    """
+    keyset, keyset_params = keyset_condition(after, 'ma.len_views_ratio', 'ma.page_id')
+    if use_top_k(cur, category_ids, 'en'):
+        sql_query = missing_articles_top_k_sql(keyset) + "LIMIT %s"
+        params = [target_language] + keyset_params + [category_ids, page_size]
+    else:
+        sql_query = missing_articles_sql(keyset) + "LIMIT %s"
+        params = ['en', category_ids, target_language] + keyset_params + [page_size]
+
+    rows, timed_out = read_page(conn, 'create_articles_page', sql_query, params)
+    articles = []
+    for row in rows:
+        articles.append({
+            'source_id': row[0],
+            'source_title': row[1],
+            'source_length': row[2],
+            'source_views': row[3],
+            'len_views_ratio': row[4],
+            'source_language': 'en',
+            'other_languages': []  # No other languages for this case
+        })
+
+    # Only the first page carries the tree's page count. A timeout rolled
+    # back the transaction and its statement_timeout, so none is attempted.
+    counted = count != 'none' and after is None
+    page_count = tree_page_count(cur, category_ids, 'en', count) if counted and not timed_out else None
     response = {
-        'articles': list(articles.values()),
-        'distinct_pages_count': distinct_pages_count
+        'articles': articles,
+        'distinct_pages_count': page_count,
+        'next_cursor': resume_cursor(articles, after) if timed_out else next_cursor(articles, page_size),
+        'timed_out': timed_out,
+        'count_timed_out': counted and page_count is None
     }
 
-    cur.close()
-    conn.close()
-    print("response", response)
-    return jsonify(response)
-
-def expand_articles(conn, cur, categories, target_language):
-    categories_placeholders = ', '.join(['%s'] * len(categories))
-
-    sql_query = f"""
-    WITH RECURSIVE CategoryHierarchy AS (
-        SELECT
-            c.category_id::text AS category_id,
-            c.category_title,
-            c.language,
-            0 AS depth
-        FROM
-            categories c
-        WHERE
-            c.category_title IN ({categories_placeholders})
-
-        UNION ALL
-
-        SELECT
-            cl.subcategory::text AS category_id,
-            c.category_title,
-            c.language,
-            ch.depth + 1 AS depth
-        FROM
-            CategoryHierarchy ch
-        JOIN
-            category_links cl ON ch.category_title::text = cl.parent_category::text AND ch.language = cl.language
-        JOIN
-            categories c ON cl.subcategory::text = c.category_id::text AND c.language = cl.language
-        WHERE
-            ch.depth < 2
-    ),
-
-    PagesOfInterest AS (
-        SELECT DISTINCT a.page_id, a.title, a.length, a.view_count, a.language,
-            ROUND(a.view_count::float / a.length * 100) / 100 AS len_views_ratio,
-            COUNT(*) OVER () AS distinct_page_count
-        FROM page_cat_link pcl
-        INNER JOIN articles a ON pcl.page_id = a.page_id
+    return response
+
+def expand_articles(conn, cur, category_ids, target_language,
+                    page_size=DEFAULT_PAGE_SIZE['expand'], after=None, count='approximate'):
+    """One page of target_language articles with their versions in other languages.
+
+    Paginated like create_articles; a page holds page_size source articles
+    together with all of their other-language versions.
+    """
+    keyset, keyset_params = keyset_condition(after, 'a.len_views_ratio', 'a.page_id')
+    has_other_languages = """EXISTS (
+            SELECT 1
+            FROM lang_links ll
+            INNER JOIN articles other ON ll.ll_from_lang = other.language AND ll.ll_from = other.page_id
+            WHERE ll.ll_lang = a.language AND ll.ll_to = a.page_id
+        )"""
+    if use_top_k(cur, category_ids, target_language):
+        # Walk articles_ratio_idx and stop once a page of matches is found
+        result_page = f"""
+    WITH ResultPage AS (
+        SELECT a.page_id, a.title, a.length, a.view_count, a.language, a.len_views_ratio
+        FROM articles a
         WHERE a.language = %s
-        AND (pcl.category, pcl.language) IN (SELECT category_title, language FROM CategoryHierarchy)
-        AND a.view_count IS NOT NULL
-        LIMIT 100
-    ),
-
-    OtherLanguagesData AS (
-        SELECT  
-            tpi.page_id as source_id,
-            tpi.title as source_title,
-            tpi.length as source_length, 
-            tpi.view_count as source_views,
-            tpi.len_views_ratio,
-            tpi.language as source_language,
-            ll.ll_from_lang as other_language,
-            ll.ll_from as other_id,
-            a.length as other_length, 
-            a.view_count as other_views, 
-            a.title as other_title,
-            distinct_page_count
-        FROM PagesOfInterest tpi 
-        INNER JOIN lang_links ll ON tpi.title = ll.ll_title and tpi.language = ll.ll_lang
-        INNER JOIN articles a ON ll.ll_from_lang = a.language AND ll.ll_from = a.page_id
-        ORDER BY tpi.len_views_ratio DESC
-        LIMIT 500
+        AND a.len_views_ratio IS NOT NULL
+        {keyset}
+        AND {page_in_categories_sql('a.page_id', 'a.language')}
+        AND {has_other_languages}
+        ORDER BY a.len_views_ratio DESC, a.page_id DESC
+        LIMIT %s
     )
+    """
+        params = [target_language] + keyset_params + [category_ids, page_size]
+    else:
+        result_page = category_pages_sql() + f""",
 
-    SELECT *
-    FROM OtherLanguagesData
+    ResultPage AS (
+        SELECT a.page_id, a.title, a.length, a.view_count, a.language, a.len_views_ratio
+        FROM CategoryPages cp
+        INNER JOIN articles a ON a.page_id = cp.page_id AND a.language = %s
+        WHERE a.len_views_ratio IS NOT NULL
+        {keyset}
+        AND {has_other_languages}
+        ORDER BY a.len_views_ratio DESC, a.page_id DESC
+        LIMIT %s
+    )
     """
+        params = [target_language, category_ids, target_language] + keyset_params + [page_size]
 
-    cur.execute(sql_query, categories + [target_language])
-    results = cur.fetchall()
+    sql_query = result_page + """
+    SELECT
+        tpi.page_id as source_id,
+        tpi.title as source_title,
+        tpi.length as source_length,
+        tpi.view_count as source_views,
+        tpi.len_views_ratio,
+        tpi.language as source_language,
+        ll.ll_from_lang as other_language,
+        ll.ll_from as other_id,
+        a.length as other_length,
+        a.view_count as other_views,
+        a.title as other_title
+    FROM ResultPage tpi
+    INNER JOIN lang_links ll ON ll.ll_lang = tpi.language AND ll.ll_to = tpi.page_id
+    INNER JOIN articles a ON ll.ll_from_lang = a.language AND ll.ll_from = a.page_id
+    ORDER BY tpi.len_views_ratio DESC, tpi.page_id DESC
+    """
 
+    rows, timed_out = read_page(conn, 'expand_articles_page', sql_query, params)
     articles = {}
-    distinct_pages_count = results[0][-1] if results else 0
-
-    for row in results:
+    for row in rows:
         source_id = row[0]
         if source_id not in articles:
             articles[source_id] = {
@@ -212,7 +493,7 @@ def expand_articles(conn, cur, categories, target_language):
                 'source_language': row[5],
                 'other_languages': []
             }
-        
+
         articles[source_id]['other_languages'].append({
             'language': row[6],
             'id': row[7],
@@ -221,12 +502,53 @@ def expand_articles(conn, cur, categories, target_language):
             'title': row[10]
         })
 
+    articles = list(articles.values())
+    if timed_out and articles:
+        # The last article's other-language rows may have been cut off; the cursor refetches it
+        articles.pop()
+    counted = count != 'none' and after is None
+    page_count = tree_page_count(cur, category_ids, target_language, count) if counted and not timed_out else None
     response = {
-        'articles': list(articles.values()),
-        'distinct_pages_count': distinct_pages_count
+        'articles': articles,
+        'distinct_pages_count': page_count,
+        'next_cursor': resume_cursor(articles, after) if timed_out else next_cursor(articles, page_size),
+        'timed_out': timed_out,
+        'count_timed_out': counted and page_count is None
     }
-    print("response",response)
-    cur.close()
-    conn.close()
-    
-    return jsonify(response)
\ No newline at end of file
+
+    return response
+
+
+def read_page(conn, name, sql_query, params):
+    """Rows of a page query, read through a server-side cursor, and whether a statement timeout cut them short.
+
+    A timeout aborts the transaction; it is rolled back here.
+    """
+    rows = []
+    try:
+        with conn.cursor(name=name) as page_cur:
+            page_cur.itersize = PAGE_FETCH_SIZE
+            page_cur.execute(sql_query, params)
+            for row in page_cur:
+                rows.append(row)
+    except errors.QueryCanceled:
+        conn.rollback()
+        logger.warning(f"{name} hit the statement timeout after {len(rows)} rows")
+        return rows, True
+    return rows, False
+
+
+def resume_cursor(articles, after):
+    """Cursor that continues a page the statement timeout stopped: after its last article, or where it started."""
+    if articles:
+        last = articles[-1]
+        return encode_cursor(last['len_views_ratio'], last['source_id'])
+    return encode_cursor(*after) if after is not None else None
+
+
+def next_cursor(articles, page_size):
+    """Cursor for the page after ``articles``, or None when this page was the last."""
+    if len(articles) < page_size:
+        return None
+    last = articles[-1]
+    return encode_cursor(last['len_views_ratio'], last['source_id'])
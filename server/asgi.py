@@ -0,0 +1,156 @@
+import io
+import os
+import sys
+import asyncio
+import inspect
+import logging
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.exceptions import HTTPException
+from flask import request
+
+# Production settings unless the deployment chose otherwise
+os.environ.setdefault('APP_CONFIG', 'production')
+from app import app as flask_app
+import sessions
+import wiki_api
+
+logger = logging.getLogger(__name__)
+
+# Synchronous routes run on asgiref threads. By default asgiref puts them all
+# on one thread per process, which would serialize the database-bound
+# searches and exports, so app() gives each request its own thread, at most
+# WEB_THREADS at once, as the gthread worker did.
+wsgi_app = WsgiToAsgi(flask_app)
+sync_slots = asyncio.Semaphore(flask_app.config['THREADS'])
+
+
+def build_environ(scope, body=b''):
+    """Translate an ASGI HTTP scope into the WSGI environ Flask builds its request from."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-length':
+            continue
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+            continue
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+
+def async_view_for(environ):
+    """Return the view a request routes to if it is ``async def``, else None."""
+    try:
+        endpoint, _ = flask_app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return None
+    view = flask_app.view_functions.get(endpoint)
+    return view if inspect.iscoroutinefunction(view) else None
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+def open_session(environ):
+    interface = flask_app.session_interface
+    session = interface.open_session(flask_app, flask_app.request_class(environ))
+    return session if session is not None else interface.make_null_session(flask_app)
+
+
+async def dispatch(view, environ):
+    """Run an async view on this event loop inside a normal Flask request context.
+
+    Mirrors Flask's full_dispatch_request, so before/after request hooks,
+    sessions, CORS headers and teardown behave as under WSGI; only the view
+    itself is awaited here instead of on a throwaway loop in a worker thread.
+    Opening and saving the session and the before/after request hooks can
+    block (session store I/O, auth.check_token refreshing an OAuth token), so
+    they run on worker threads; to_thread carries the request context along.
+    """
+    # Picked up by SelectiveSessionInterface when the context is pushed
+    environ[sessions.PREOPENED_SESSION] = await asyncio.to_thread(open_session, environ)
+    with flask_app.request_context(environ):
+        try:
+            rv = await asyncio.to_thread(flask_app.preprocess_request)
+            if rv is None:
+                rv = await view(**request.view_args)
+            response = flask_app.make_response(rv)
+        except HTTPException as e:
+            response = flask_app.make_response(flask_app.handle_http_exception(e))
+        except Exception as e:
+            response = flask_app.handle_exception(e)
+        return await asyncio.to_thread(flask_app.process_response, response)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            wiki_api.keep_async_api(asyncio.get_running_loop())
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await wiki_api.close_async_api()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point: ``gunicorn -c gunicorn.conf.py`` or ``uvicorn asgi:app``.
+
+    Views declared ``async def`` (the ones that wait on the MediaWiki API) are
+    awaited on the server's event loop, so one worker holds many of them in
+    flight at once. Every other route is handed to the Flask WSGI app.
+    """
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+
+    if scope['type'] == 'http':
+        # Also for servers run without lifespan events: this loop serves every request
+        wiki_api.keep_async_api(asyncio.get_running_loop())
+        environ = build_environ(scope)
+        view = async_view_for(environ)
+        if view is not None:
+            environ = build_environ(scope, await read_body(receive))
+            response = await dispatch(view, environ)
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in response.headers.items()],
+            })
+            await send({'type': 'http.response.body', 'body': response.get_data()})
+            return
+
+    async with sync_slots, ThreadSensitiveContext():
+        await wsgi_app(scope, receive, send)
@@ -1,8 +1,10 @@
 import os
 import time
 import logging
-from flask import Blueprint, request, redirect, session, make_response, jsonify
+from flask import Blueprint, current_app, request, redirect, session, make_response, jsonify
 from requests_oauthlib import OAuth2Session
+from wiki_api import api, WikiApiError
+from sessions import uses_session, request_uses_session
 
 auth_bp = Blueprint('auth', __name__)
 logger = logging.getLogger(__name__)
@@ -26,6 +28,7 @@ client_url = os.getenv('CLIENT_URL')
 
 
 @auth_bp.route('/logout')
+@uses_session
 def logout():
     try:
         logger.info('Logging out user')
@@ -33,14 +36,11 @@ def logout():
         username = session.pop('username', None)
 
         if token:
-            wikipedia = OAuth2Session(client_id, token=token)
-            revoke_url = 'https://en.wikipedia.org/w/api.php?action=logout&format=json'
-            revoke_response = wikipedia.post(revoke_url)
-            
-            if revoke_response.status_code == 200:
+            try:
+                api.post({'action': 'logout'}, token=token['access_token'])
                 logger.info('Successfully revoked token')
-            else:
-                logger.warning(f'Failed to revoke token: {revoke_response.status_code}')
+            except WikiApiError as e:
+                logger.warning(f'Failed to revoke token: {e}')
 
         response = make_response({'message': 'Logged out successfully'})
         response.delete_cookie('username', domain=None, samesite='Lax')
@@ -58,6 +58,7 @@ def logout():
 
 
 @auth_bp.route('/start_wiki_oauth')
+@uses_session
 def start_wiki_oauth():
     try:
         logger.debug('Starting OAuth process with Wikipedia')
@@ -74,6 +75,7 @@ def start_wiki_oauth():
 
 # Modify your wiki_callback route to include expires_at
 @auth_bp.route('/wiki_login')
+@uses_session
 def wiki_callback():
     try:
         logger.info('Received callback from Wikipedia OAuth')
@@ -161,9 +163,10 @@ def refresh_token_if_needed():
 @auth_bp.before_app_request
 def check_token():
     """Before each request, check and refresh token if necessary"""
-    # Skip token check for OAuth routes and static files
-    if request.endpoint in ['start_wiki_oauth', 'wiki_callback'] or \
-       request.path.startswith('/static/'):
+    # Skip token check for OAuth routes, and for static files and public API
+    # routes, which never load the session
+    if request.endpoint in ['auth.start_wiki_oauth', 'auth.wiki_callback'] or \
+       not request_uses_session(current_app):
         return
         
     refresh_token_if_needed()
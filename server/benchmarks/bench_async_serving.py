@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from stub_wiki_api import start_stub_server
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Commands with {port} filled in; each runs one worker process
+SERVERS = {
+    # One synchronous thread: each request holds it for its whole upstream wait
+    'wsgi': [sys.executable, '-c',
+             "import sys; from werkzeug.serving import run_simple; from app import app; "
+             "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=False)", '{port}'],
+    # gunicorn's threaded WSGI worker with WEB_THREADS threads
+    'gthread': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', '1',
+                '--worker-class', 'gthread', '--threads', os.getenv('WEB_THREADS', '4'),
+                '--bind', '127.0.0.1:{port}', 'wsgi:app'],
+    # The shipped production server: gunicorn.conf.py's uvicorn worker
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', '1',
+                 '--bind', '127.0.0.1:{port}'],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--workers', '1',
+             '--log-level', 'warning', '--port', '{port}'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"Server did not start listening on {port}")
+
+
+def add_to_watchlist(url):
+    """One /add_to_watchlist call: two upstream calls (token, then watch) behind it."""
+    body = json.dumps({'title': 'Stub article'}).encode('utf-8')
+    req = urllib.request.Request(url, data=body, method='POST', headers={
+        'Content-Type': 'application/json',
+        'Cookie': 'access_token=stub',
+    })
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            ok = response.status == 200 and json.loads(response.read()).get('success')
+    except OSError:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_level(url, concurrency, requests_per_level):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: add_to_watchlist(url), range(requests_per_level)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"  concurrency {concurrency:>4}: {requests_per_level / elapsed:8.1f} req/s  "
+          f"p50 {p50 * 1000:8.1f} ms  p95 {p95 * 1000:8.1f} ms  errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API-bound endpoints against a stubbed MediaWiki API.")
+    parser.add_argument("--modes", default="wsgi,gthread,gunicorn", help="Comma-separated serving modes to compare")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds each upstream call takes")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated client concurrency levels")
+    parser.add_argument("--rounds", type=int, default=4, help="Requests per client at each level")
+    args = parser.parse_args()
+
+    upstream = start_stub_server(latency=args.latency)
+    # asgi.py runs the production config; a throwaway key lets it boot whichever session backend is set
+    env = dict(os.environ, WIKI_API_URL=upstream.url, WIKI_API_CONCURRENCY='64')
+    env.setdefault('SECRET_KEY', 'bench-only-secret')
+    # Nothing written to the server's session directory
+    env.setdefault('SESSION_BACKEND', 'cookie')
+    levels = [int(level) for level in args.concurrency.split(',')]
+    print(f"Upstream latency {args.latency * 1000:.0f} ms per call, 2 calls per request, "
+          f"gthread with {os.getenv('WEB_THREADS', '4')} threads")
+
+    for mode in args.modes.split(','):
+        port = free_port()
+        command = [part.format(port=port) for part in SERVERS[mode]]
+        server = subprocess.Popen(command, cwd=SERVER_DIR, env=env)
+        try:
+            wait_for_port(port)
+            print(f"{mode}:")
+            for concurrency in levels:
+                run_level(f"http://127.0.0.1:{port}/add_to_watchlist", concurrency, concurrency * args.rounds)
+        finally:
+            server.terminate()
+            server.wait()
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from category_graph import CategoryGraph
+
+
+def skewed_index(rng, count, exponent):
+    """Index in [0, count) where low indexes are far more likely, like real category sizes."""
+    return int(count * rng.random() ** exponent)
+
+
+def synthetic_edges(category_count, seed):
+    """(parent_id, child_id) pairs shaped like bench_search_queries' wiki, with a few cycles."""
+    rng = random.Random(seed)
+    edges = []
+    for category_id in range(1, category_count):
+        for _ in range(rng.choice((1, 1, 1, 2))):
+            edges.append((skewed_index(rng, category_id, 2), category_id))
+        if rng.random() < 0.002:
+            edges.append((category_id, skewed_index(rng, category_id, 2)))
+    edges.sort()
+    return edges
+
+
+def dict_of_lists(edges):
+    """The obvious alternative the compressed rows are measured against."""
+    graph = defaultdict(list)
+    for parent_id, child_id in edges:
+        graph[parent_id].append(child_id)
+    return graph
+
+
+def traced(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def time_descendants(graph, roots, depth, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        found, _ = graph.descendants(roots, depth)
+    return (time.perf_counter() - start) / repeat, len(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Memory and descendant-query latency of the in-memory category graph.")
+    parser.add_argument("--categories", type=int, default=1000000, help="Categories in the synthetic graph")
+    parser.add_argument("--depths", default="1,2,3,5", help="Comma-separated expansion depths")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs averaged per query")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    edges = synthetic_edges(args.categories, args.seed)
+    graph, graph_bytes, build_seconds = traced(lambda: CategoryGraph.from_sorted_edges(edges))
+    _, dict_bytes, _ = traced(lambda: dict_of_lists(edges))
+    print(f"{len(edges)} links, built in {build_seconds:.2f}s")
+    print(f"compressed rows {graph.memory_bytes() / 1e6:8.1f} MB (traced {graph_bytes / 1e6:.1f} MB)")
+    print(f"dict of lists   {dict_bytes / 1e6:8.1f} MB")
+
+    # From the root everything hangs off to categories deep in the tail
+    roots = {
+        'root': [0],
+        'large': [50],
+        'medium': [5000],
+        'small': [args.categories // 2],
+        'multi': [400, 450, 500],
+    }
+    print(f"\n{'roots':<8} {'depth':>5} {'categories':>10} {'microseconds':>13}")
+    for name, category_ids in roots.items():
+        for depth in [int(depth) for depth in args.depths.split(',')]:
+            seconds, found = time_descendants(graph, category_ids, depth, args.repeat)
+            print(f"{name:<8} {depth:>5} {found:>10} {seconds * 1e6:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import re
+import sys
+import gzip
+import time
+import random
+import argparse
+import tempfile
+
+# Appended: add_lang_to_db has its own articles.py and categories.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'add_lang_to_db'))
+from dump_parser import iter_dump_rows, iter_values
+
+PREFIX = b"INSERT INTO `categorylinks` VALUES "
+TITLE_WORDS = ['History', "People's", 'of', 'Tel_Aviv', 'A),(B', 'C:\\\\Path', 'Births', 'ירושלים', '2010s_deaths']
+
+
+def make_row(rng, page_id):
+    title = '_'.join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(1, 4))).replace("'", "\\'")
+    sortkey = title.upper()
+    cl_type = rng.choice(['page', 'page', 'page', 'subcat', 'file'])
+    return f"({page_id},'{title}','{sortkey}','2024-07-01 12:00:00','','uppercase','{cl_type}')"
+
+
+def write_fixture(path, rows, rows_per_statement=1000, seed=42):
+    """Write a synthetic categorylinks dump and return its uncompressed size in bytes."""
+    rng = random.Random(seed)
+    size = 0
+    with gzip.open(path, 'wb', compresslevel=1) as file:
+        file.write(b"-- synthetic categorylinks dump\n")
+        for start in range(0, rows, rows_per_statement):
+            values = ','.join(make_row(rng, page_id) for page_id in range(start, min(start + rows_per_statement, rows)))
+            line = PREFIX + values.encode('utf-8') + b";\n"
+            size += len(line)
+            file.write(line)
+    return size
+
+
+def legacy_parse(path):
+    """The per-character parser the import scripts used before dump_parser."""
+    def parse_insert_values(values_str):
+        values = []
+        current_value = []
+        in_quotes = False
+        for char in values_str:
+            if char == "'" and (not current_value or current_value[-1] != '\\'):
+                in_quotes = not in_quotes
+            elif char == ',' and not in_quotes:
+                values.append(''.join(current_value).strip("'"))
+                current_value = []
+            else:
+                current_value.append(char)
+        if current_value:
+            values.append(''.join(current_value).strip("'"))
+        return values
+
+    insert_stmt_re = re.compile(r"INSERT INTO `categorylinks` VALUES (.*);")
+    with gzip.open(path, 'rt', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            match = insert_stmt_re.search(line)
+            if match:
+                for tuple_str in re.split(r'\),\s*\(', match.group(1).strip('()')):
+                    yield parse_insert_values(tuple_str)
+
+
+def measure(name, rows_iter, size):
+    start = time.perf_counter()
+    count = sum(1 for _ in rows_iter)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {count:>10} rows  {elapsed:8.2f}s  {size / elapsed / 1e6:8.1f} MB/s")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure dump parser throughput on a synthetic categorylinks dump.")
+    parser.add_argument("--rows", type=int, default=500000, help="Number of rows in the fixture")
+    parser.add_argument("--legacy", action="store_true", help="Also time the old per-character parser")
+    parser.add_argument("--workers", type=int, default=0, help="Also time parallel parsing with this many processes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'categorylinks.sql.gz')
+        size = write_fixture(path, args.rows)
+        print(f"Fixture: {args.rows} rows, {size / 1e6:.1f} MB uncompressed")
+
+        with gzip.open(path, 'rb') as file:
+            lines = [line for line in file if line.startswith(PREFIX)]
+        measure('tokenize (in memory)', (row for line in lines for row in iter_values(line, len(PREFIX))), size)
+        measure('iter_dump_rows (gzip)', iter_dump_rows(path, 'categorylinks'), size)
+        # The columns cat_links.py and page_cat_link.py actually read
+        count = measure('3 columns (gzip)', iter_dump_rows(path, 'categorylinks', (0, 1, 6)), size)
+        if count != args.rows:
+            raise SystemExit(f"Parsed {count} rows, expected {args.rows}")
+        if args.workers:
+            measure(f'3 columns, {args.workers} procs', iter_dump_rows(path, 'categorylinks', (0, 1, 6),
+                                                             workers=args.workers, chunk_bytes=1 << 20), size)
+        if args.legacy:
+            measure('legacy parser (gzip)', legacy_parse(path), size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from export import EXPORT_COLUMNS, serialize
+
+
+def synthetic_rows(count):
+    """Rows shaped like missing_articles, produced lazily like a server-side cursor."""
+    for page_id in range(count):
+        yield (page_id, f"Synthetic_article_title_{page_id}", 1000 + page_id % 5000, 50 + page_id % 997,
+               round((50 + page_id % 997) / (1000 + page_id % 5000), 2))
+
+
+def in_memory(rows):
+    """What a jsonify response does: every row in one list, then one big string."""
+    return json.dumps({'articles': [dict(zip(EXPORT_COLUMNS, row)) for row in rows]})
+
+
+def streamed(rows, export_format):
+    size = 0
+    for chunk in serialize(rows, export_format):
+        size += len(chunk)
+    return size
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show that streamed exports use flat memory as the row count grows.")
+    parser.add_argument("--rows", default="10000,100000,1000000", help="Comma-separated row counts")
+    parser.add_argument("--skip-in-memory", action="store_true", help="Only measure the streaming serializers")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'mode':<10} {'peak MB':>9} {'seconds':>8}")
+    for count in [int(rows) for rows in args.rows.split(',')]:
+        modes = [('ndjson', lambda: streamed(synthetic_rows(count), 'ndjson')),
+                 ('csv', lambda: streamed(synthetic_rows(count), 'csv'))]
+        if not args.skip_in_memory:
+            modes.append(('in memory', lambda: in_memory(synthetic_rows(count))))
+        for name, fn in modes:
+            peak, elapsed = measure(fn)
+            print(f"{count:>10}  {name:<10} {peak / 1e6:9.2f} {elapsed:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
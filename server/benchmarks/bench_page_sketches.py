@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import random
+import argparse
+from collections import defaultdict
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, SERVER_DIR)
+sys.path.append(os.path.join(SERVER_DIR, 'add_lang_to_db'))
+from page_sketches import estimate_union
+from category_sketches import REGISTERS, add, encode
+
+
+def skewed_index(rng, count, exponent):
+    """Index in [0, count) where low indexes are far more likely, like real category sizes."""
+    return int(count * rng.random() ** exponent)
+
+
+def synthetic_members(pages, category_count, seed):
+    """Member page ids per category, shaped like bench_search_queries' wiki."""
+    rng = random.Random(seed)
+    members = defaultdict(set)
+    for page_id in range(pages):
+        for _ in range(rng.randint(1, 5)):
+            members[skewed_index(rng, category_count, 3)].add(page_id)
+    return members
+
+
+def build(members):
+    sketches = {}
+    for category_id, page_ids in members.items():
+        registers = bytearray(REGISTERS)
+        for page_id in page_ids:
+            add(registers, page_id)
+        sketches[category_id] = encode(registers)
+    return sketches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Accuracy, size and merge latency of the per-category page sketches.")
+    parser.add_argument("--pages", type=int, default=500000, help="Pages in the synthetic wiki")
+    parser.add_argument("--categories", type=int, default=50000, help="Categories in the synthetic wiki")
+    parser.add_argument("--unions", default="1,10,100,1000,10000", help="Comma-separated categories per query")
+    parser.add_argument("--queries", type=int, default=20, help="Random queries per union size")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    members = synthetic_members(args.pages, args.categories, args.seed)
+    start = time.perf_counter()
+    sketches = build(members)
+    print(f"{len(sketches)} sketches built in {time.perf_counter() - start:.1f}s")
+    links = sum(len(page_ids) for page_ids in members.values())
+    sketch_bytes = sum(len(sketch) for sketch in sketches.values())
+    dense = sum(len(sketch) == REGISTERS for sketch in sketches.values())
+    print(f"{sketch_bytes / 1e6:.1f} MB of sketches for {links} memberships ({dense} dense)")
+
+    rng = random.Random(args.seed)
+    category_ids = list(sketches)
+    print(f"\n{'categories':>10} {'pages':>9} {'mean error':>11} {'max error':>10} {'microseconds':>13}")
+    for union in [int(size) for size in args.unions.split(',')]:
+        errors = []
+        pages = 0
+        elapsed = 0.0
+        for _ in range(args.queries):
+            chosen = rng.sample(category_ids, min(union, len(category_ids)))
+            exact = len(set().union(*(members[category_id] for category_id in chosen)))
+            start = time.perf_counter()
+            estimate = estimate_union([sketches[category_id] for category_id in chosen])
+            elapsed += time.perf_counter() - start
+            errors.append(abs(estimate - exact) / exact)
+            pages += exact
+        print(f"{union:>10} {pages // args.queries:>9} {sum(errors) / len(errors):>10.2%} "
+              f"{max(errors):>10.2%} {elapsed / args.queries * 1e6:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import psycopg2
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, SERVER_DIR)
+# Appended, so the pipeline's own articles.py does not shadow the server's
+sys.path.append(os.path.join(SERVER_DIR, 'add_lang_to_db'))
+from articles import create_articles, expand_articles, decode_cursor, DEFAULT_CATEGORY_DEPTH
+from category_graph import CategoryGraphService
+from copy_loader import CopyLoader
+from category_closure import build_closure
+from category_sketches import build_sketches
+from missing_articles import build_missing_articles
+from page_cat_link import update_page_counts
+from schema import apply_schema, create_indexes
+
+SOURCE_LANG = 'en'
+# Target languages and the share of English pages each one already covers
+TARGET_LANGS = {'he': 0.15, 'fr': 0.4}
+
+# Expands the searched categories like the endpoint does, outside the measured SQL
+category_graph = CategoryGraphService()
+
+# Dropped before every load, so the schema module recreates them from scratch
+TABLES = ('articles', 'categories', 'category_links', 'page_cat_link', 'lang_links',
+          'category_closure', 'category_sketches', 'missing_articles', 'dataset_version', 'schema_version')
+
+
+def skewed_index(rng, count, exponent):
+    """Index in [0, count) where low indexes are far more likely, like real category sizes."""
+    return int(count * rng.random() ** exponent)
+
+
+def generate(conn, pages, category_count, seed):
+    """Load a synthetic wiki with power-law category sizes and view counts; return pages per category."""
+    rng = random.Random(seed)
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {', '.join(TABLES)}")
+    conn.commit()
+    apply_schema(conn)
+
+    print(f"Generating {category_count} categories and {pages} pages...")
+    with CopyLoader(conn, 'categories', ('category_id', 'category_title', 'language')) as loader:
+        for category_id in range(category_count):
+            loader.add((category_id, f"Cat_{category_id}", SOURCE_LANG))
+
+    # Older categories collect most subcategories; a few back edges make cycles
+    with CopyLoader(conn, 'category_links', ('parent_id', 'child_id', 'language')) as loader:
+        for category_id in range(1, category_count):
+            for _ in range(rng.choice((1, 1, 1, 2))):
+                loader.add((skewed_index(rng, category_id, 2), category_id, SOURCE_LANG))
+            if rng.random() < 0.002:
+                loader.add((category_id, skewed_index(rng, category_id, 2), SOURCE_LANG))
+
+    category_sizes = [0] * category_count
+    with CopyLoader(conn, 'articles', ('page_id', 'title', 'length', 'language', 'view_count')) as articles, \
+            CopyLoader(conn, 'page_cat_link', ('page_id', 'category_id', 'language')) as page_cats:
+        for page_id in range(pages):
+            length = int(rng.lognormvariate(8, 1.2))
+            views = None if rng.random() < 0.1 else int(rng.paretovariate(1.2) * 10)
+            articles.add((page_id, f"Article_{page_id}", length, SOURCE_LANG, views))
+            for category_id in {skewed_index(rng, category_count, 3) for _ in range(rng.randint(1, 5))}:
+                page_cats.add((page_id, category_id, SOURCE_LANG))
+                category_sizes[category_id] += 1
+
+    # Target-language versions of part of the English pages, linked back to them
+    with CopyLoader(conn, 'articles', ('page_id', 'title', 'length', 'language', 'view_count')) as articles, \
+            CopyLoader(conn, 'lang_links', ('ll_from_lang', 'll_from', 'll_lang', 'll_title',
+                                            'll_title_norm', 'll_to')) as links:
+        for offset, (lang, coverage) in enumerate(TARGET_LANGS.items(), start=1):
+            for page_id in range(pages):
+                # Popular pages are more likely to be translated already
+                if rng.random() < coverage * (1.5 if page_id % 7 == 0 else 1):
+                    other_id = offset * pages + page_id
+                    articles.add((other_id, f"{lang}_Article_{page_id}", int(rng.lognormvariate(7.5, 1.2)),
+                                  lang, int(rng.paretovariate(1.2) * 5)))
+                    links.add((lang, other_id, SOURCE_LANG, f"Article {page_id}", f"Article_{page_id}", page_id))
+
+    update_page_counts(conn, SOURCE_LANG)
+    # The indexes the import scripts build after their loads
+    create_indexes(conn, ['categories', 'articles', 'category_links', 'page_cat_link', 'lang_links'])
+    print("Building category_closure, category_sketches and missing_articles...")
+    build_closure(SOURCE_LANG, DEFAULT_CATEGORY_DEPTH, conn, cur)
+    build_sketches(SOURCE_LANG, conn)
+    for lang in TARGET_LANGS:
+        build_missing_articles(SOURCE_LANG, lang, conn, cur)
+    create_indexes(conn, ['missing_articles'])
+    conn.autocommit = True
+    cur.execute("VACUUM ANALYZE")
+    conn.autocommit = False
+    return category_sizes
+
+
+def query_mix(category_sizes):
+    """Fixed searches spanning the category-size distribution, from the giant roots to the tail."""
+    ranked = sorted(range(len(category_sizes)), key=lambda category_id: -category_sizes[category_id])
+
+    def pick(rank):
+        return f"Cat_{ranked[min(rank, len(ranked) - 1)]}"
+
+    groups = {
+        'huge': [pick(0)],
+        'large': [pick(50)],
+        'medium': [pick(500)],
+        'small': [pick(5000)],
+        'multi': [pick(400), pick(450), pick(500)],
+    }
+    mix = []
+    for size, categories in groups.items():
+        for lang in TARGET_LANGS:
+            mix.append((f"create_{lang}_{size}", create_articles, categories, lang, False, 'approximate'))
+        mix.append((f"create_he_{size}_exact", create_articles, categories, 'he', False, 'exact'))
+        mix.append((f"create_he_{size}_page2", create_articles, categories, 'he', True, 'approximate'))
+        mix.append((f"expand_en_{size}", expand_articles, categories, SOURCE_LANG, False, 'approximate'))
+    return mix
+
+
+class RecordingCursor:
+    """Cursor proxy that records every statement so it can be EXPLAINed afterwards."""
+
+    def __init__(self, cursor, statements):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_statements', statements)
+
+    def execute(self, sql, params=None):
+        self._statements.append((sql, params))
+        return self._cursor.execute(sql, params)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+
+class RecordingConnection:
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements = []
+
+    def cursor(self, name=None):
+        return RecordingCursor(self.conn.cursor(name=name) if name else self.conn.cursor(), self.statements)
+
+
+def run_search(conn, search, categories, lang, second_page, count):
+    """Run one search like the endpoint does; returns the statements it executed."""
+    recording = RecordingConnection(conn)
+    category_ids, _ = category_graph.expand(conn, SOURCE_LANG if search is create_articles else lang, categories,
+                                         DEFAULT_CATEGORY_DEPTH)
+    after = None
+    if second_page:
+        with conn.cursor() as cur:
+            first = search(conn, cur, category_ids, lang, count=count)
+        if first['next_cursor'] is None:
+            return []
+        after = decode_cursor(first['next_cursor'])
+    with recording.cursor() as cur:
+        search(recording, cur, category_ids, lang, after=after, count=count)
+    conn.rollback()
+    return recording.statements
+
+
+def plan_signature(node):
+    """The shape of a plan: node types and the relations and indexes they touch, without costs."""
+    label = node['Node Type']
+    for key in ('Relation Name', 'Index Name', 'CTE Name'):
+        if key in node:
+            label += f" {node[key]}"
+    children = [plan_signature(child) for child in node.get('Plans', [])]
+    return [label, children] if children else [label]
+
+
+def explain(conn, statements):
+    plans = []
+    with conn.cursor() as cur:
+        for sql, params in statements:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql.strip().rstrip(';'), params)
+            plan = cur.fetchone()[0][0]
+            plans.append({
+                'signature': plan_signature(plan['Plan']),
+                'execution_ms': plan['Execution Time'],
+                'shared_hit_blocks': plan['Plan'].get('Shared Hit Blocks', 0),
+                'shared_read_blocks': plan['Plan'].get('Shared Read Blocks', 0),
+                'plan': plan,
+            })
+    conn.rollback()
+    return plans
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run_mix(conn, mix, repeat, warmup):
+    results = {}
+    for name, search, categories, lang, second_page, count in mix:
+        for _ in range(warmup):
+            run_search(conn, search, categories, lang, second_page, count)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            statements = run_search(conn, search, categories, lang, second_page, count)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results[name] = {
+            'categories': categories,
+            'p50_ms': percentile(timings, 0.5),
+            'p95_ms': percentile(timings, 0.95),
+            'p99_ms': percentile(timings, 0.99),
+            'plans': explain(conn, statements),
+        }
+        print(f"{name:<28} p50 {results[name]['p50_ms']:8.1f} ms  p95 {results[name]['p95_ms']:8.1f} ms  "
+              f"p99 {results[name]['p99_ms']:8.1f} ms")
+    return results
+
+
+def compare(results, baseline, max_slowdown, min_delta_ms, allow_plan_changes):
+    """Return a description of every regression against the baseline run."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = max(base['p95_ms'] * (1 + max_slowdown), base['p95_ms'] + min_delta_ms)
+        if result['p95_ms'] > limit:
+            regressions.append(f"{name}: p95 {result['p95_ms']:.1f} ms, baseline {base['p95_ms']:.1f} ms")
+        if not allow_plan_changes:
+            old_plans = [plan['signature'] for plan in base['plans']]
+            new_plans = [plan['signature'] for plan in result['plans']]
+            if old_plans != new_plans:
+                regressions.append(f"{name}: query plan changed")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the search SQL on synthetic data and fail on latency or plan regressions.")
+    parser.add_argument("--dsn", default="dbname=search_bench user=postgres",
+                        help="Scratch database; its search tables are dropped and regenerated")
+    parser.add_argument("--pages", type=int, default=200000, help="English pages to generate")
+    parser.add_argument("--categories", type=int, default=20000, help="Categories to generate")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reuse", action="store_true", help="Keep the data from the previous run")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed runs per query")
+    parser.add_argument("--output", default="search_bench_results.json", help="Where to write this run's results")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=0.5, help="Allowed p95 growth over the baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="p95 growth always tolerated, for noise")
+    parser.add_argument("--allow-plan-changes", action="store_true", help="Only compare timings")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    if conn.info.dbname == 'test_db':
+        raise SystemExit("Refusing to regenerate tables in the import database; use a scratch database")
+
+    sizes_path = os.path.splitext(args.output)[0] + '.categories.json'
+    if args.reuse and os.path.exists(sizes_path):
+        with open(sizes_path) as file:
+            category_sizes = json.load(file)
+    else:
+        category_sizes = generate(conn, args.pages, args.categories, args.seed)
+        with open(sizes_path, 'w') as file:
+            json.dump(category_sizes, file)
+
+    results = run_mix(conn, query_mix(category_sizes), args.repeat, args.warmup)
+    conn.close()
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=1)
+    print(f"Results and plans written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.max_slowdown, args.min_delta_ms, args.allow_plan_changes)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
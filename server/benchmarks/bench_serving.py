@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def server_command(mode, port, workers, threads):
+    if mode == 'dev':
+        # What `python app.py` runs: the debug dev server
+        return [sys.executable, '-c',
+                "import sys; from app import create_app; "
+                "create_app('development').run(port=int(sys.argv[1]), debug=True, use_reloader=False)", str(port)]
+    if mode == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+                '--workers', str(workers), '--threads', str(threads)]
+    if mode == 'uvicorn':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                '--workers', str(workers), '--log-level', 'warning']
+    raise SystemExit(f"Unknown mode {mode}")
+
+
+def get(url):
+    """GET a URL and return its status; error statuses count as served requests."""
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def wait_until_serving(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            get(url)
+            return
+        except OSError:
+            time.sleep(0.02)
+    raise SystemExit(f"No response from {url} within {timeout}s")
+
+
+def measure_throughput(url, concurrency, duration):
+    deadline = time.monotonic() + duration
+
+    def client(_):
+        latencies = []
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            status = get(url)
+            latencies.append((time.perf_counter() - start, status))
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = [item for latencies in executor.map(client, range(concurrency)) for item in latencies]
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status in results if status >= 500)
+    return len(results) / duration, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time and requests/sec of the server in each launch mode.")
+    parser.add_argument("--modes", default="dev,gunicorn", help="Comma-separated: dev, gunicorn, uvicorn")
+    parser.add_argument("--endpoint", default="/api/get-user-data", help="Path to load")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16, help="Client threads")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per mode")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(','):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        url = f"http://127.0.0.1:{port}{args.endpoint}"
+
+        start = time.perf_counter()
+        server = subprocess.Popen(server_command(mode, port, args.workers, args.threads), cwd=SERVER_DIR,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_serving(url)
+            cold_start = time.perf_counter() - start
+            rps, p50, p99, errors = measure_throughput(url, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{mode:<10} cold start {cold_start:6.2f}s  {rps:8.1f} req/s  "
+              f"p50 {p50 * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms  5xx {errors}")
+
+
+if __name__ == "__main__":
+    main()
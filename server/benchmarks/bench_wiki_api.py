@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import argparse
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from stub_wiki_api import start_stub_server, categories_of
+from wiki_api import WikiApiClient
+
+
+def legacy_categories(api_url, titles):
+    """One fresh connection and one call per title, as categories.py used to do."""
+    found = {}
+    for title in titles:
+        response = requests.get(api_url, params={
+            "action": "query", "titles": title, "prop": "categories", "format": "json", "cllimit": "max"})
+        categories = []
+        for page_info in response.json().get("query", {}).get("pages", {}).values():
+            categories.extend(cat["title"] for cat in page_info.get("categories", []))
+        found[title] = categories
+    return found
+
+
+def client_categories(client, titles):
+    pages = client.query_titles(titles, {"prop": "categories", "cllimit": "max"})
+    return {title: [cat["title"] for cat in pages.get(title, {}).get("categories", [])] for title in titles}
+
+
+def measure(name, server, fn):
+    calls, connections = server.calls, server.connections
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed * 1000:9.1f} ms  {server.calls - calls:5} calls  "
+          f"{server.connections - connections:5} connections")
+    return result
+
+
+def check(result, titles):
+    for title in titles:
+        expected = categories_of(title.replace('_', ' '))
+        if result.get(title) != expected:
+            raise SystemExit(f"Wrong categories for {title!r}: {result.get(title)} != {expected}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-title API calls with the batched client on a stub server.")
+    parser.add_argument("--titles", type=int, default=300, help="Titles to look up")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds each stub call takes")
+    parser.add_argument("--concurrency", type=int, default=4, help="Client calls in flight at once")
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    # Underscores exercise normalization; long titles get enough categories to need 'continue'
+    titles = [f"Article_{i}" if i % 3 else f"Article {i} " + "x" * (i % 40) for i in range(args.titles)]
+
+    # Not checked: the old code never followed 'continue', so it drops categories here
+    measure('per-title requests.get', server, lambda: legacy_categories(server.url, titles))
+    client = WikiApiClient(api_url=server.url, max_concurrency=args.concurrency)
+    check(measure('batched client', server, lambda: client_categories(client, titles)), titles)
+    check(measure('batched client (warm)', server, lambda: client_categories(client, titles)), titles)
+
+    watchlist = [item['title'] for data in client.query({'list': 'watchlist', 'wllimit': 'max'}, token='t')
+                 for item in data['query']['watchlist']]
+    if len(watchlist) != server.watchlist_size:
+        raise SystemExit(f"Watchlist continuation returned {len(watchlist)} of {server.watchlist_size} titles")
+
+    # Every fifth call is throttled; the client must wait it out and still get everything
+    server.maxlag_every = 5
+    check(measure('batched client, maxlag', server, lambda: client_categories(client, titles)), titles)
+    server.maxlag_every = 0
+
+    for name, metrics in client.stats().items():
+        print(f"  {name:<20} calls={metrics['calls']:<5} retries={metrics['retries']:<4} "
+              f"errors={metrics['errors']:<3} avg={metrics['avg_ms']:.1f} ms  max={metrics['max_ms']:.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
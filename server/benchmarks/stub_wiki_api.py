@@ -0,0 +1,152 @@
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, urlsplit
+
+# Categories returned per page before the stub answers with 'continue', small
+# enough that multi-title batches span several responses
+CATEGORIES_PER_RESPONSE = 4
+WATCHLIST_PER_RESPONSE = 50
+
+
+def categories_of(title):
+    """Deterministic fake categories, so callers can check what they got back."""
+    return [f"Category:{title} topic {i}" for i in range(len(title) % 7 + 1)]
+
+
+class StubWikiApi(BaseHTTPRequestHandler):
+    """Answers the handful of MediaWiki API calls the server makes."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.handle_call(dict(parse_qsl(urlsplit(self.path).query)))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('utf-8')
+        self.handle_call(dict(parse_qsl(body)))
+
+    def handle_call(self, params):
+        server = self.server
+        with server.lock:
+            server.calls += 1
+            throttle = server.maxlag_every and server.calls % server.maxlag_every == 0
+            if 'titles' in params:
+                server.titles_per_call.append(len(params['titles'].split('|')))
+        if server.latency:
+            time.sleep(server.latency)
+
+        if throttle and server.throttle_status == 200:
+            self.send_json({'error': {'code': 'maxlag', 'info': 'Waiting for a database server'}},
+                           headers={'MediaWiki-API-Error': 'maxlag', 'Retry-After': '0'})
+            return
+        if throttle:
+            # 429 Too Many Requests or 503 from the API's rate limiting
+            self.send_json({'error': {'code': 'ratelimited', 'info': 'Slow down'}},
+                           status=server.throttle_status, headers={'Retry-After': '0'})
+            return
+
+        action = params.get('action')
+        if action == 'query' and params.get('prop') == 'categories':
+            self.send_json(self.categories(params))
+        elif action == 'query' and params.get('list') == 'usercontribs':
+            self.send_json({'query': {'usercontribs': [
+                {'title': f"Edited page {i}"} for i in range(int(params.get('uclimit', 10)))]}})
+        elif action == 'query' and params.get('list') == 'watchlist':
+            self.send_json(self.watchlist(params))
+        elif action == 'query' and params.get('meta') == 'tokens':
+            self.send_json({'query': {'tokens': {'watchtoken': 'stubtoken+\\'}}})
+        elif action in ('watch', 'logout'):
+            self.send_json({action: [{'title': params.get('titles')}]} if action == 'watch' else {})
+        else:
+            self.send_json({'error': {'code': 'badparams', 'info': f'Unsupported call: {params}'}})
+
+    def categories(self, params):
+        titles = params['titles'].split('|')
+        offset = int(params.get('clcontinue', 0))
+        normalized = [{'from': title, 'to': title.replace('_', ' ')} for title in titles if '_' in title]
+        pages = {}
+        more = False
+        for page_id, title in enumerate(titles, start=1):
+            title = title.replace('_', ' ')
+            categories = categories_of(title)
+            chunk = categories[offset:offset + CATEGORIES_PER_RESPONSE]
+            more = more or len(categories) > offset + CATEGORIES_PER_RESPONSE
+            page = {'pageid': page_id, 'ns': 0, 'title': title}
+            if chunk:
+                page['categories'] = [{'ns': 14, 'title': category} for category in chunk]
+            pages[str(page_id)] = page
+        data = {'batchcomplete': '', 'query': {'normalized': normalized, 'pages': pages}}
+        if more:
+            data['continue'] = {'clcontinue': str(offset + CATEGORIES_PER_RESPONSE), 'continue': '||'}
+        return data
+
+    def watchlist(self, params):
+        offset = int(params.get('wlcontinue', 0))
+        items = [{'title': f"Watched page {i}"}
+                 for i in range(offset, min(offset + WATCHLIST_PER_RESPONSE, self.server.watchlist_size))]
+        data = {'query': {'watchlist': items}}
+        if offset + WATCHLIST_PER_RESPONSE < self.server.watchlist_size:
+            data['continue'] = {'wlcontinue': str(offset + WATCHLIST_PER_RESPONSE), 'continue': '-||'}
+        return data
+
+    def send_json(self, data, status=200, headers=None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0, latency=0.0, maxlag_every=0, watchlist_size=120, throttle_status=200):
+    """Serve the stub API from a background thread; ``server.url`` is its api.php URL.
+
+    Every ``maxlag_every``th call is throttled: a maxlag error when
+    ``throttle_status`` is 200, otherwise that HTTP status (429 or 503).
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubWikiApi)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.calls = 0
+    server.connections = 0
+    server.latency = latency
+    server.maxlag_every = maxlag_every
+    server.throttle_status = throttle_status
+    server.titles_per_call = []
+    server.watchlist_size = watchlist_size
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/w/api.php"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stub of the MediaWiki API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each call takes")
+    parser.add_argument("--maxlag-every", type=int, default=0, help="Answer every Nth call with a maxlag error")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency, args.maxlag_every)
+    print(f"Stub MediaWiki API at {server.url} (set WIKI_API_URL to use it)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
-import requests
+import asyncio
+import logging
 from flask import Blueprint, request, jsonify
 from database import get_db_connection
+from wiki_api import get_async_api
 
 categories_bp = Blueprint('categories', __name__)
+logger = logging.getLogger(__name__)
 
 # ...category-related routes and functions...
 # @categories_bp.route('/api/suggest_categories') ...
@@ -15,47 +18,82 @@ categories_bp = Blueprint('categories', __name__)
 
 
 @categories_bp.route('/api/suggest_categories', methods=['POST'])
-def suggest_categories():
+async def suggest_categories():
     data = request.json
-    print(data)
+    logger.debug(f"Category suggestion request: {data}")
     recommendation_type = data.get('recommendationType')
 
     if recommendation_type == 'inventory':
         articles = data.get('articles', [])
         if not articles:
             return jsonify({"error": "No articles provided"}), 400
-        suggested_categories = generate_category_suggestions(articles)
+        suggested_categories = await generate_category_suggestions(articles)
     elif recommendation_type == 'editHistory':
         wikipedia_username = data.get('wikipediaUsername')
         if not wikipedia_username:
             return jsonify({"error": "No Wikipedia username provided"}), 400
-        suggested_categories = generate_suggestions_from_edit_history(wikipedia_username)
+        suggested_categories = await generate_suggestions_from_edit_history(wikipedia_username)
     else:
         return jsonify({'error': 'Invalid recommendation type'}), 400
 
     return jsonify({"categories": suggested_categories})
 
 
-def get_article_categories(article_title):
-    url = "https://en.wikipedia.org/w/api.php"
-    params = {
-        "action": "query",
-        "titles": article_title,
+async def get_article_categories(titles):
+    """Categories of each title from the live API, 50 titles per call."""
+    pages = await get_async_api().query_titles(titles, {
         "prop": "categories",
-        "format": "json",
         "cllimit": "max"
-    }
+    })
 
-    response = requests.get(url, params=params)
-    data = response.json()
+    return {
+        title: [cat["title"] for cat in pages.get(title, {}).get("categories", [])]
+        for title in titles
+    }
 
-    categories = []
-    pages = data.get("query", {}).get("pages", {})
-    for page_id, page_info in pages.items():
-        if "categories" in page_info:
-            categories.extend([cat["title"] for cat in page_info["categories"]])
 
-    return categories
+def get_local_article_categories(titles, language='en'):
+    """Look up the categories of many titles in the ingested page_cat_link in one query.
+
+    Returns {title: [category, ...]} in the API's "Category:Title with spaces"
+    form, only for titles that exist in our articles table.
+    """
+    # Dump titles use underscores, API and watchlist titles use spaces
+    normalized = {title.replace(' ', '_'): title for title in titles}
+    conn = get_db_connection()
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT a.title, c.category_title
+            FROM articles a
+            LEFT JOIN page_cat_link pcl ON pcl.page_id = a.page_id AND pcl.language = a.language
+            LEFT JOIN categories c ON c.category_id = pcl.category_id AND c.language = pcl.language
+            WHERE a.language = %s AND a.title = ANY(%s)
+        """, (language, list(normalized)))
+        rows = cur.fetchall()
+
+    found = {}
+    for title, category in rows:
+        categories = found.setdefault(normalized[title], [])
+        if category is not None:
+            categories.append('Category:' + category.replace('_', ' '))
+    return found
+
+
+async def get_categories_for_titles(titles):
+    """Categories of each title, from the local index first and the live API for the rest."""
+    unique_titles = list(dict.fromkeys(titles))
+    try:
+        # psycopg2 blocks, so keep it off the event loop
+        found = await asyncio.to_thread(get_local_article_categories, unique_titles)
+    except Exception as e:
+        logger.warning(f'Local category lookup failed, using the live API: {e}')
+        found = {}
+
+    missing = [title for title in unique_titles if title not in found]
+    if missing:
+        logger.info(f'{len(missing)} of {len(unique_titles)} titles not found locally, asking the API')
+        found.update(await get_article_categories(missing))
+    return found
 
 
 def contains_ignored_words(category):
@@ -66,10 +104,11 @@ def contains_ignored_words(category):
     return False
 
 
-def generate_category_suggestions(articles):
+async def generate_category_suggestions(articles):
     category_count = {}
+    categories_by_title = await get_categories_for_titles(articles)
     for article in articles:
-        categories = get_article_categories(article)
+        categories = categories_by_title[article]
         for category in categories:
             if contains_ignored_words(category):
                 continue
@@ -80,22 +119,17 @@ def generate_category_suggestions(articles):
 
     sorted_categories = sorted(category_count.items(), key=lambda item: item[1], reverse=True)
     top_suggestions = [category for category, count in sorted_categories[:10]]
-    print(top_suggestions)
+    logger.debug(f"Suggested categories: {top_suggestions}")
     return top_suggestions
 
 
-def get_user_edit_history(username):
-    url = "https://en.wikipedia.org/w/api.php"
-    params = {
+async def get_user_edit_history(username):
+    data = await get_async_api().get({
         "action": "query",
         "list": "usercontribs",
         "ucuser": username,
-        "uclimit": "100",
-        "format": "json"
-    }
-
-    response = requests.get(url, params=params)
-    data = response.json()
+        "uclimit": "100"
+    })
 
     edit_history = []
     for edit in data.get("query", {}).get("usercontribs", []):
@@ -104,12 +138,13 @@ def get_user_edit_history(username):
     return edit_history
 
 
-def generate_suggestions_from_edit_history(username):
-    edit_history = get_user_edit_history(username)
+async def generate_suggestions_from_edit_history(username):
+    edit_history = await get_user_edit_history(username)
     category_count = {}
+    categories_by_title = await get_categories_for_titles(edit_history)
 
     for article_title in edit_history:
-        categories = get_article_categories(article_title)
+        categories = categories_by_title[article_title]
         for category in categories:
             if contains_ignored_words(category):
                 continue
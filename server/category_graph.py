@@ -0,0 +1,231 @@
+import os
+import time
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip while loading a language's category_links
+LOAD_BATCH_SIZE = 100000
+
+
+class CategoryGraph:
+    """One language's category hierarchy as compressed sparse rows of plain int arrays.
+
+    ``parents`` holds every category that has subcategories, sorted; the
+    subcategories of ``parents[i]`` are ``children[offsets[i]:offsets[i + 1]]``.
+    Three 4-byte arrays instead of a dict of lists keep enwiki's few million
+    links in tens of megabytes, and a lookup is one binary search.
+    """
+
+    def __init__(self, parents, offsets, children):
+        self.parents = parents
+        self.offsets = offsets
+        self.children = children
+
+    @classmethod
+    def from_sorted_edges(cls, edges):
+        """Build from (parent_id, child_id) pairs ordered by parent_id."""
+        parents = array('i')
+        offsets = array('i', [0])
+        children = array('i')
+        last_parent = None
+        for parent_id, child_id in edges:
+            if parent_id != last_parent:
+                if last_parent is not None:
+                    if parent_id < last_parent:
+                        raise ValueError('Edges must be ordered by parent_id')
+                    offsets.append(len(children))
+                parents.append(parent_id)
+                last_parent = parent_id
+            children.append(child_id)
+        if last_parent is not None:
+            offsets.append(len(children))
+        return cls(parents, offsets, children)
+
+    @classmethod
+    def load(cls, conn, language):
+        """Read a language's category_links through a server-side cursor."""
+        with conn.cursor(name='category_graph_edges') as cur:
+            cur.itersize = LOAD_BATCH_SIZE
+            cur.execute("""
+                SELECT parent_id, child_id
+                FROM category_links
+                WHERE language = %s
+                ORDER BY parent_id
+            """, (language,))
+            graph = cls.from_sorted_edges(cur)
+        conn.rollback()
+        return graph
+
+    def subcategories(self, category_id):
+        i = bisect_left(self.parents, category_id)
+        if i < len(self.parents) and self.parents[i] == category_id:
+            return self.children[self.offsets[i]:self.offsets[i + 1]]
+        return ()
+
+    def descendants(self, category_ids, max_depth, max_categories=None):
+        """The given categories and every subcategory up to max_depth levels below them.
+
+        Breadth-first with a visited set, so cycles and diamonds in the
+        category graph are expanded once. Stops as soon as max_categories
+        have been collected, keeping the shallowest ones; returns the set and
+        whether it was cut short.
+        """
+        seen = set()
+        frontier = []
+        for category_id in dict.fromkeys(category_ids):
+            if max_categories is not None and len(seen) >= max_categories:
+                return seen, True
+            seen.add(category_id)
+            frontier.append(category_id)
+        for _ in range(max_depth):
+            next_frontier = []
+            for category_id in frontier:
+                for child_id in self.subcategories(category_id):
+                    if child_id not in seen:
+                        if max_categories is not None and len(seen) >= max_categories:
+                            return seen, True
+                        seen.add(child_id)
+                        next_frontier.append(child_id)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return seen, False
+
+    def memory_bytes(self):
+        return sum(a.itemsize * len(a) for a in (self.parents, self.offsets, self.children))
+
+    def stats(self):
+        return {
+            'categories_with_subcategories': len(self.parents),
+            'links': len(self.children),
+            'memory_bytes': self.memory_bytes(),
+        }
+
+
+class CategoryGraphService:
+    """Per-language category graphs held in process, rebuilt when an import lands.
+
+    Graphs are loaded on first use (or by preload at startup). Like
+    SearchCache, the dataset version is re-read at most every
+    ``version_ttl`` seconds; when add_language_to_db.py has bumped it, the
+    next request per language rebuilds that language's graph while other
+    threads keep answering from the old one. With ``enabled`` off, nothing
+    is held in memory and expansion reads the category_closure table instead.
+    """
+
+    def __init__(self, version_loader=None, version_ttl=30.0, enabled=True):
+        self.version_loader = version_loader
+        self.version_ttl = version_ttl
+        self.enabled = enabled
+        self._graphs = {}
+        self._build_lock = threading.Lock()
+        self._version = None
+        self._version_checked = 0.0
+
+    @classmethod
+    def from_env(cls, version_loader=None):
+        return cls(version_loader,
+                   version_ttl=float(os.getenv('CATEGORY_GRAPH_VERSION_TTL', 30)),
+                   enabled=os.getenv('CATEGORY_GRAPH', '1') != '0')
+
+    def current_version(self):
+        if self.version_loader is None:
+            return 0
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked >= self.version_ttl:
+            self._version = self.version_loader()
+            self._version_checked = now
+        return self._version
+
+    def graph(self, conn, language):
+        """The language's graph, building it if it is missing or older than the data."""
+        version = self.current_version()
+        entry = self._graphs.get(language)
+        if entry is not None and entry['version'] == version:
+            return entry['graph']
+        # Another thread is already rebuilding; serve the old graph meanwhile
+        if entry is not None and not self._build_lock.acquire(blocking=False):
+            return entry['graph']
+        if entry is None:
+            self._build_lock.acquire()
+        try:
+            entry = self._graphs.get(language)
+            if entry is None or entry['version'] != version:
+                entry = self._build(conn, language, version)
+            return entry['graph']
+        finally:
+            self._build_lock.release()
+
+    def _build(self, conn, language, version):
+        start = time.perf_counter()
+        graph = CategoryGraph.load(conn, language)
+        entry = {
+            'graph': graph,
+            'version': version,
+            'load_seconds': round(time.perf_counter() - start, 3),
+        }
+        self._graphs[language] = entry
+        logger.info(f"Loaded the '{language}' category graph (dataset version {version}) in "
+                    f"{entry['load_seconds']}s: {len(graph.children)} links, {graph.memory_bytes() / 1e6:.1f} MB")
+        return entry
+
+    def preload(self, conn):
+        """Build the graph of every language that has category links."""
+        if not self.enabled:
+            return
+        with conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT language FROM category_links")
+            languages = [row[0] for row in cur.fetchall()]
+        conn.rollback()
+        for language in languages:
+            self.graph(conn, language)
+
+    def reload(self):
+        """Drop every graph so each is rebuilt on its next use."""
+        with self._build_lock:
+            self._graphs.clear()
+            self._version = None
+
+    def expand(self, conn, language, titles, max_depth, max_categories=None):
+        """Ids of the named categories and their subcategories up to max_depth levels below.
+
+        Returns the sorted ids and whether max_categories cut the expansion short.
+        """
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT category_id
+                FROM categories
+                WHERE language = %s AND category_title = ANY(%s)
+            """, (language, list(titles)))
+            root_ids = [row[0] for row in cur.fetchall()]
+            if self.enabled:
+                category_ids, truncated = self.graph(conn, language).descendants(root_ids, max_depth, max_categories)
+            else:
+                # Shallowest first, like the graph walk; one row past the
+                # budget tells whether it was reached
+                cur.execute("""
+                    SELECT descendant_id
+                    FROM category_closure
+                    WHERE language = %s AND root_id = ANY(%s) AND depth <= %s
+                    GROUP BY descendant_id
+                    ORDER BY MIN(depth), descendant_id
+                    LIMIT %s
+                """, (language, root_ids, max_depth, max_categories + 1 if max_categories is not None else None))
+                category_ids = [row[0] for row in cur.fetchall()]
+                truncated = max_categories is not None and len(category_ids) > max_categories
+                category_ids = category_ids[:max_categories]
+        return sorted(category_ids), truncated
+
+    def stats(self):
+        languages = {language: dict(entry['graph'].stats(), version=entry['version'],
+                                    load_seconds=entry['load_seconds'])
+                     for language, entry in list(self._graphs.items())}
+        return {
+            'enabled': self.enabled,
+            'languages': languages,
+            'memory_bytes': sum(language['memory_bytes'] for language in languages.values()),
+        }
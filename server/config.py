@@ -0,0 +1,59 @@
+import os
+
+
+class Config:
+    """Settings shared by every environment. Pick one with APP_CONFIG or pass it to create_app."""
+    DEBUG = False
+    LOG_LEVEL = 'INFO'
+    SECRET_KEY = os.environ.get('SECRET_KEY', 1234321)
+    # cookie, redis or filesystem; see sessions.init_app
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'filesystem')
+    SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    # Open the database pool while the app is built instead of on the first request
+    PRELOAD_DB_POOL = False
+    # Build every language's in-memory category graph while the app is built
+    # instead of on the first search in that language
+    PRELOAD_CATEGORY_GRAPH = False
+    # Cost guardrails for one search: the deepest subcategory level a client
+    # may ask for, the most categories its expansion may collect, and how long
+    # each of its SQL statements may run. With CATEGORY_GRAPH=0 the depth is
+    # also capped by how deep category_closure was built.
+    SEARCH_MAX_DEPTH = int(os.getenv('SEARCH_MAX_DEPTH', 5))
+    SEARCH_MAX_CATEGORIES = int(os.getenv('SEARCH_MAX_CATEGORIES', 20000))
+    SEARCH_STATEMENT_TIMEOUT_MS = int(os.getenv('SEARCH_STATEMENT_TIMEOUT_MS', 10000))
+    # Exports read whole category trees, so they get longer per statement
+    EXPORT_STATEMENT_TIMEOUT_MS = int(os.getenv('EXPORT_STATEMENT_TIMEOUT_MS', 60000))
+
+    HOST = os.getenv('HOST', '127.0.0.1')
+    PORT = int(os.getenv('PORT', 3000))
+    # Used by gunicorn.conf.py and asgi.py: WEB_THREADS is how many synchronous
+    # requests a worker runs at once. Each worker has its own database pool,
+    # so keep DB_POOL_MAX at least WEB_THREADS and WEB_WORKERS * DB_POOL_MAX
+    # within what Postgres allows.
+    WORKERS = int(os.getenv('WEB_WORKERS', 1))
+    THREADS = int(os.getenv('WEB_THREADS', 1))
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    LOG_LEVEL = 'DEBUG'
+
+
+class ProductionConfig(Config):
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING')
+    # Sessions hold the user's OAuth token, refresh token included, so they
+    # stay server-side: filesystem (the default) for the workers of one host,
+    # redis once the app runs on several
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'filesystem')
+    SESSION_COOKIE_SECURE = True
+    PRELOAD_DB_POOL = True
+    PRELOAD_CATEGORY_GRAPH = True
+    HOST = os.getenv('HOST', '0.0.0.0')
+    WORKERS = int(os.getenv('WEB_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+    THREADS = int(os.getenv('WEB_THREADS', 4))
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
@@ -1,23 +1,193 @@
 import os
+import time
+import logging
+import threading
 import psycopg2
+from psycopg2 import errors, pool
+from flask import g
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool that blocks while saturated and records checkout metrics."""
+
+    def __init__(self, minconn, maxconn, checkout_timeout=10.0, healthcheck_interval=30.0, **connect_kwargs):
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        # psycopg2 raises instead of waiting when the pool is exhausted, so the
+        # semaphore is what makes callers queue for a free connection.
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.healthcheck_interval = healthcheck_interval
+
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.saturated_checkouts = 0
+        self.timeouts = 0
+        self.discarded = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def getconn(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.saturated_checkouts += 1
+            if not self._slots.acquire(timeout=self.checkout_timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise pool.PoolError(f"No database connection available after {self.checkout_timeout}s")
+        waited = time.perf_counter() - start
+
+        try:
+            conn = self._checkout_healthy()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        return conn
+
+    def putconn(self, conn):
+        try:
+            close = conn.closed != 0
+            self._pool.putconn(conn, close=close)
+            with self._lock:
+                if close:
+                    self._last_used.pop(id(conn), None)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'saturation': self.in_use / self.maxconn,
+                'checkouts': self.checkouts,
+                'saturated_checkouts': self.saturated_checkouts,
+                'timeouts': self.timeouts,
+                'discarded_connections': self.discarded,
+                'wait_avg_ms': (self.wait_total / self.checkouts * 1000) if self.checkouts else 0.0,
+                'wait_max_ms': self.wait_max * 1000,
+            }
+
+    def _checkout_healthy(self):
+        """Check out a connection that passes the health check, discarding the ones that don't.
+
+        After a database restart every idle connection is dead, so keep going
+        until one passes. There are at most maxconn idle ones, so the last
+        attempt is always a freshly opened connection; if even that fails,
+        the database is down and the error is raised.
+        """
+        for attempt in range(self.maxconn + 1):
+            conn = self._pool.getconn()
+            if self._is_healthy(conn):
+                return conn
+
+            logger.warning('Discarding broken database connection')
+            self._pool.putconn(conn, close=True)
+            with self._lock:
+                self.discarded += 1
+                self._last_used.pop(id(conn), None)
+        raise psycopg2.OperationalError(f"No healthy database connection after {self.maxconn + 1} attempts")
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        # Only ping connections that sat idle long enough for the server or a
+        # firewall to have dropped them; recently used ones are trusted.
+        with self._lock:
+            last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the application-wide pool, creating it from the environment on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    minconn=int(os.getenv('DB_POOL_MIN', 1)),
+                    maxconn=int(os.getenv('DB_POOL_MAX', 10)),
+                    checkout_timeout=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                    healthcheck_interval=float(os.getenv('DB_POOL_HEALTHCHECK_INTERVAL', 30)),
+                    host=os.getenv('DB_HOST'),
+                    user=os.getenv('DB_USER'),
+                    password=os.getenv('DB_PASSWORD'),
+                    dbname=os.getenv('DB_NAME')
+                )
+                logger.info(f'Database pool created (min={_pool.minconn}, max={_pool.maxconn})')
+    return _pool
+
 
 def get_db_connection():
-    # Retrieve the connection details from environment variables
-    host = os.getenv('DB_HOST')
-    user = os.getenv('DB_USER')
-    password = os.getenv('DB_PASSWORD')
-    dbname = os.getenv('DB_NAME')
+    """Check out a pooled connection for the current app context.
+
+    The same connection is reused for the rest of the request and returned to
+    the pool by close_db_connection when the app context tears down, including
+    when the request raised.
+    """
+    if 'db_conn' not in g:
+        g.db_conn = get_pool().getconn()
+    return g.db_conn
+
+
+def close_db_connection(exception=None):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        get_pool().putconn(conn)
+
+
+def pool_stats():
+    return get_pool().stats() if _pool is not None else {}
+
+
+def init_app(app):
+    app.teardown_appcontext(close_db_connection)
+
 
-    # Connect to the database
+def load_dataset_version():
+    """Return the dataset version add_language_to_db.py bumps after each import, 0 before the first."""
+    conn = get_db_connection()
     try:
-        connection = psycopg2.connect(
-            host=host,
-            user=user,
-            password=password,
-            dbname=dbname
-        )
-        print("Database connection successful")
-        return connection
-    except Exception as e:
-        print("Error connecting to the database:", e)
-        return None
\ No newline at end of file
+        with conn.cursor() as cur:
+            cur.execute('SELECT version FROM dataset_version')
+            row = cur.fetchone()
+        conn.rollback()
+        return row[0] if row else 0
+    except errors.UndefinedTable:
+        conn.rollback()
+        return 0
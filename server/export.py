@@ -0,0 +1,53 @@
+import io
+import csv
+import json
+
+# Columns of an exported missing-article row, in order
+EXPORT_COLUMNS = ['page_id', 'title', 'length', 'view_count', 'len_views_ratio']
+
+# Bytes of output gathered before handing a chunk to the server; big enough to
+# avoid per-row writes, small enough that memory stays flat
+CHUNK_SIZE = 64 * 1024
+
+# json.dumps with options builds a new encoder per call; reuse one
+_encoder = json.JSONEncoder(ensure_ascii=False)
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def ndjson_chunks(rows, chunk_size=CHUNK_SIZE):
+    """Serialize rows as one JSON object per line, yielded in chunks of about chunk_size."""
+    lines = []
+    size = 0
+    for row in rows:
+        line = _encoder.encode(dict(zip(EXPORT_COLUMNS, row))) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield ''.join(lines)
+
+
+def csv_chunks(rows, chunk_size=CHUNK_SIZE):
+    """Serialize rows as CSV with a header line, yielded in chunks of about chunk_size."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def serialize(rows, export_format):
+    return ndjson_chunks(rows) if export_format == 'ndjson' else csv_chunks(rows)
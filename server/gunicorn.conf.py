@@ -0,0 +1,31 @@
+# gunicorn -c gunicorn.conf.py
+# Worker and thread counts come from config.ProductionConfig (WEB_WORKERS,
+# WEB_THREADS), so the app and the server agree on how it is sized.
+#
+# Uvicorn workers serve asgi.py: the async views that wait on the MediaWiki
+# API share one event loop per worker, so a worker keeps many of them in
+# flight, where a gthread worker held a thread for each one's whole upstream
+# wait. Synchronous routes still get WEB_THREADS threads per worker.
+# benchmarks/bench_async_serving.py compares the two.
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+os.environ.setdefault('APP_CONFIG', 'production')
+from config import CONFIGS
+
+# Not named config: gunicorn reads that as its own -c setting
+app_config = CONFIGS[os.environ['APP_CONFIG']]
+
+wsgi_app = 'asgi:app'
+bind = f'{app_config.HOST}:{app_config.PORT}'
+workers = app_config.WORKERS
+worker_class = 'uvicorn_worker.UvicornWorker'
+# Each worker imports the app and opens its own database pool after forking;
+# preloading in the master would share pooled connections between processes
+preload_app = False
+loglevel = app_config.LOG_LEVEL.lower()
+accesslog = None
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = 10000
+max_requests_jitter = 1000
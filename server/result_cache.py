@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Seconds a Redis entry lives. Keys of an older dataset version are never
+# read again, so without an expiry they would pile up in Redis forever.
+DEFAULT_REDIS_TTL = 24 * 60 * 60
+
+
+class LRUCache:
+    """In-process LRU bounded by entry count and by the total size of the cached JSON."""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.size_bytes += size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """Shared tier in a directory, one JSON file per key, visible to every worker on the host.
+
+    Bounded like LRUCache, by entry count and total size. A hit refreshes the
+    file's mtime, and every ``sweep_every`` writes the least recently used
+    files are deleted until the directory fits again. Entries of an older
+    dataset version are never hit again, so they are the first to go.
+    """
+
+    def __init__(self, directory, max_entries=10000, max_bytes=512 * 1024 * 1024, sweep_every=100):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_every = sweep_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Whatever earlier runs left behind counts against the limits too
+        self.sweep()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                payload = file.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Swept by another worker since the read
+            pass
+        return payload
+
+    def set(self, key, payload):
+        path = self._path(key)
+        # Write then rename so readers never see a half-written entry
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(payload)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % self.sweep_every == 0
+        if sweep:
+            self.sweep()
+
+    def sweep(self):
+        """Delete the least recently used entries until the directory is within its limits; returns how many."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        count = len(entries)
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            count -= 1
+            total -= size
+        if removed:
+            logger.info(f'Search cache sweep removed {removed} entries from {self.directory}')
+        return removed
+
+
+class RedisCache:
+    """Shared tier in Redis or anything speaking its protocol."""
+
+    def __init__(self, url, ttl=DEFAULT_REDIS_TTL):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        payload = self.client.get(key)
+        return payload.decode('utf-8') if payload is not None else None
+
+    def set(self, key, payload):
+        self.client.set(key, payload, ex=self.ttl)
+
+
+class SearchCache:
+    """Two-tier cache of search responses, invalidated by the dataset version.
+
+    Keys embed the dataset version that add_language_to_db.py bumps after every
+    import, so entries computed against older data are never served. The
+    version itself is re-read through ``version_loader`` at most every
+    ``version_ttl`` seconds, which keeps cache hits off the database.
+    """
+
+    def __init__(self, local, shared=None, version_loader=None, version_ttl=30.0):
+        self.local = local
+        self.shared = shared
+        self.version_loader = version_loader
+        self.version_ttl = version_ttl
+        self._version = None
+        self._version_checked = 0.0
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, version_loader=None):
+        local = LRUCache(
+            max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 1024)),
+            max_bytes=int(os.getenv('SEARCH_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        )
+        shared = None
+        url = os.getenv('SEARCH_CACHE_URL')
+        if url:
+            try:
+                if url.startswith(('redis://', 'rediss://', 'unix://')):
+                    shared = RedisCache(url, ttl=int(os.getenv('SEARCH_CACHE_TTL', DEFAULT_REDIS_TTL)))
+                else:
+                    shared = DiskCache(
+                        url[len('file://'):] if url.startswith('file://') else url,
+                        max_entries=int(os.getenv('SEARCH_CACHE_DISK_MAX_ENTRIES', 10000)),
+                        max_bytes=int(os.getenv('SEARCH_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+                    )
+            except ImportError:
+                logger.warning('SEARCH_CACHE_URL is set but the redis package is not installed; '
+                               'using the in-process cache only')
+        return cls(local, shared, version_loader,
+                   version_ttl=float(os.getenv('SEARCH_CACHE_VERSION_TTL', 30)))
+
+    def current_version(self):
+        if self.version_loader is None:
+            return 0
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked >= self.version_ttl:
+            version = self.version_loader()
+            with self._lock:
+                if version != self._version:
+                    # Older entries can no longer be hit; free the memory now
+                    self.local.clear()
+                self._version = version
+                self._version_checked = now
+        return self._version
+
+    def make_key(self, task, language, categories, **params):
+        """Normalize a search into a key: categories are de-duplicated and sorted."""
+        normalized = ','.join(sorted({category.strip() for category in categories if category.strip()}))
+        extra = ''.join(f':{name}={params[name]}' for name in sorted(params))
+        return f'search:v{self.current_version()}:{task}:{language}{extra}:{normalized}'
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return value
+
+        if self.shared is not None:
+            try:
+                payload = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f'Shared search cache read failed: {e}')
+                self._count('errors')
+                payload = None
+            if payload is not None:
+                value = json.loads(payload)
+                self.local.set(key, value, len(payload))
+                self._count('shared_hits')
+                return value
+
+        self._count('misses')
+        return None
+
+    def set(self, key, value):
+        payload = json.dumps(value)
+        self.local.set(key, value, len(payload))
+        if self.shared is not None:
+            try:
+                self.shared.set(key, payload)
+            except Exception as e:
+                logger.warning(f'Shared search cache write failed: {e}')
+                self._count('errors')
+
+    def stats(self):
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            'dataset_version': self._version,
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': (self.local_hits + self.shared_hits) / lookups if lookups else 0.0,
+            'local_entries': len(self.local),
+            'local_bytes': self.local.size_bytes,
+            'shared_tier': type(self.shared).__name__ if self.shared is not None else None,
+        }
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
@@ -0,0 +1,80 @@
+import logging
+from flask import request
+from flask.sessions import SessionInterface, SecureCookieSessionInterface
+from werkzeug.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# WSGI environ key under which the ASGI server hands over a session it has
+# already opened off the event loop; see asgi.dispatch
+PREOPENED_SESSION = 'missingpedia.session'
+
+
+def uses_session(view):
+    """Mark a view as reading or writing the session; all others never load it."""
+    view.uses_session = True
+    return view
+
+
+def request_uses_session(app, req=None):
+    """Whether the view the request routes to is marked with uses_session."""
+    req = req or request
+    try:
+        endpoint, _ = app.url_map.bind_to_environ(req.environ).match()
+    except HTTPException:
+        return False
+    return getattr(app.view_functions.get(endpoint), 'uses_session', False)
+
+
+class SelectiveSessionInterface(SessionInterface):
+    """Open the real session only for views marked with uses_session.
+
+    Static files, the SPA and the public API routes get Flask's null session,
+    so they do no session store I/O and never set a session cookie.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def open_session(self, app, request):
+        preopened = request.environ.pop(PREOPENED_SESSION, None)
+        if preopened is not None:
+            return preopened
+        if request_uses_session(app, request):
+            return self.backend.open_session(app, request)
+        return self.make_null_session(app)
+
+    def save_session(self, app, session, response):
+        if not self.is_null_session(session):
+            self.backend.save_session(app, session, response)
+
+
+def init_app(app):
+    """Install the session backend named by SESSION_BACKEND.
+
+    cookie      Flask's signed cookie; nothing stored server-side, so any
+                worker can serve any user. Signed, not encrypted: the
+                browser holds the whole OAuth token, refresh token
+                included, and a large token can pass the 4 KB cookie
+                limit, so it is for development only
+    redis       flask_session in Redis at SESSION_REDIS_URL, shared by workers
+    filesystem  flask_session files on local disk, single host only
+    """
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'cookie':
+        if not isinstance(app.secret_key, (str, bytes)):
+            raise RuntimeError('The cookie session backend signs sessions with SECRET_KEY; set it in the environment')
+        interface = SecureCookieSessionInterface()
+    elif backend in ('redis', 'filesystem'):
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = backend
+        if backend == 'redis':
+            import redis
+            app.config['SESSION_REDIS'] = redis.Redis.from_url(app.config['SESSION_REDIS_URL'])
+        Session(app)
+        interface = app.session_interface
+    else:
+        raise ValueError(f'Unknown SESSION_BACKEND: {backend}')
+
+    app.session_interface = SelectiveSessionInterface(interface)
+    logger.info(f'Session backend: {backend}')
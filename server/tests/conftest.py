@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The server and the import pipeline run from their own directories with flat
+# imports; the stub API and the fixture builders live with the benchmarks
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(1, os.path.join(SERVER_DIR, 'benchmarks'))
+sys.path.append(os.path.join(SERVER_DIR, 'add_lang_to_db'))
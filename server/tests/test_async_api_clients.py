@@ -0,0 +1,104 @@
+import os
+import json
+import asyncio
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('httpx')
+# Signed-cookie sessions, so the requests below leave nothing on disk
+os.environ.setdefault('SESSION_BACKEND', 'cookie')
+os.environ.setdefault('SECRET_KEY', 'test-only-secret')
+
+import wiki_api
+from stub_wiki_api import start_stub_server
+
+REQUESTS = 5
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    server = start_stub_server()
+    monkeypatch.setattr(wiki_api.api, 'api_url', server.url)
+    settings = wiki_api._client_settings
+    monkeypatch.setattr(wiki_api, '_client_settings', lambda: {**settings(), 'api_url': server.url})
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def counting_clients(monkeypatch):
+    counts = {'created': 0, 'closed': 0}
+
+    class CountingClient(wiki_api.AsyncWikiApiClient):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            counts['created'] += 1
+
+        async def aclose(self):
+            await super().aclose()
+            counts['closed'] += 1
+
+    monkeypatch.setattr(wiki_api, 'AsyncWikiApiClient', CountingClient)
+    return counts
+
+
+def test_wsgi_requests_share_the_sync_pool(upstream, counting_clients):
+    from app import app
+    client = app.test_client()
+    client.set_cookie('access_token', 'stub')
+    for _ in range(REQUESTS):
+        response = client.post('/add_to_watchlist', json={'title': 'Stub article'})
+        assert response.get_json()['success']
+    # Each request ran on a throwaway loop; none of them opened an httpx pool
+    assert counting_clients == {'created': 0, 'closed': 0}
+    # Two upstream calls per request over the sync client's keep-alive connections
+    assert upstream.calls == 2 * REQUESTS
+    assert upstream.connections <= wiki_api.api.max_concurrency * 2
+
+
+async def call_asgi(app, scope, body=b''):
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+async def serve_asgi(requests):
+    import asgi
+    lifespan_messages = asyncio.Queue()
+    await lifespan_messages.put({'type': 'lifespan.startup'})
+    lifespan_sent = []
+
+    async def send(message):
+        lifespan_sent.append(message['type'])
+
+    lifespan = asyncio.create_task(asgi.app({'type': 'lifespan'}, lifespan_messages.get, send))
+    body = json.dumps({'title': 'Stub article'}).encode('utf-8')
+    results = []
+    for _ in range(requests):
+        sent = await call_asgi(asgi.app, {
+            'type': 'http', 'method': 'POST', 'path': '/add_to_watchlist', 'query_string': b'',
+            'http_version': '1.1', 'scheme': 'http', 'root_path': '',
+            'headers': [(b'content-type', b'application/json'), (b'cookie', b'access_token=stub'),
+                        (b'content-length', str(len(body)).encode('ascii'))],
+        }, body)
+        results.append(json.loads(sent[-1]['body']))
+    await lifespan_messages.put({'type': 'lifespan.shutdown'})
+    await lifespan
+    return results, lifespan_sent
+
+
+def test_asgi_worker_keeps_one_client_and_closes_it(upstream, counting_clients):
+    results, lifespan_sent = asyncio.run(serve_asgi(REQUESTS))
+    assert all(result['success'] for result in results)
+    assert lifespan_sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    # One pool for the worker's loop, closed when the server shuts down
+    assert counting_clients == {'created': 1, 'closed': 1}
+    assert upstream.calls == 2 * REQUESTS
@@ -0,0 +1,54 @@
+import pytest
+
+from category_graph import CategoryGraph
+
+# 1 has subcategories 2 and 3, 2 has 4 and 5, and 4 has 6. 3 -> 1 closes a
+# cycle and 5 -> 3 a diamond.
+EDGES = [(1, 2), (1, 3), (2, 4), (2, 5), (3, 1), (4, 6), (5, 3)]
+
+
+@pytest.fixture
+def graph():
+    return CategoryGraph.from_sorted_edges(EDGES)
+
+
+def test_subcategories(graph):
+    assert list(graph.subcategories(2)) == [4, 5]
+    assert list(graph.subcategories(6)) == []
+    assert list(graph.subcategories(99)) == []
+
+
+def test_depth(graph):
+    assert graph.descendants([2], 0) == ({2}, False)
+    assert graph.descendants([2], 1) == ({2, 4, 5}, False)
+    assert graph.descendants([2], 2) == ({2, 4, 5, 6, 3}, False)
+    assert graph.descendants([4, 3], 1) == ({4, 6, 3, 1}, False)
+
+
+def test_cycles_are_expanded_once(graph):
+    assert graph.descendants([1], 100) == ({1, 2, 3, 4, 5, 6}, False)
+    assert graph.descendants([3], 100) == ({1, 2, 3, 4, 5, 6}, False)
+
+
+def test_budget_keeps_shallowest_categories(graph):
+    assert graph.descendants([1], 5, max_categories=3) == ({1, 2, 3}, True)
+    assert graph.descendants([1], 5, max_categories=4) == ({1, 2, 3, 4}, True)
+    # Exactly enough is not truncated
+    assert graph.descendants([1], 5, max_categories=6) == ({1, 2, 3, 4, 5, 6}, False)
+    # The requested categories count against the budget too
+    assert graph.descendants([4, 5, 6], 5, max_categories=2) == ({4, 5}, True)
+
+
+def test_duplicate_roots(graph):
+    assert graph.descendants([2, 2, 4], 1) == ({2, 4, 5, 6}, False)
+
+
+def test_unsorted_edges_are_rejected():
+    with pytest.raises(ValueError):
+        CategoryGraph.from_sorted_edges([(2, 4), (1, 2)])
+
+
+def test_empty_graph():
+    graph = CategoryGraph.from_sorted_edges([])
+    assert graph.descendants([7], 3) == ({7}, False)
+    assert graph.stats() == {'categories_with_subcategories': 0, 'links': 0, 'memory_bytes': 4}
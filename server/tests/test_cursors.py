@@ -0,0 +1,52 @@
+import json
+import base64
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('psycopg2')
+from articles import decode_cursor, encode_cursor, next_cursor, parse_categories, resume_cursor
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+
+@pytest.mark.parametrize('position', [(0.0, 1), (123.456, 987654321), (1e-12, 0), (5, 7)])
+def test_round_trip(position):
+    assert decode_cursor(encode_cursor(*position)) == (float(position[0]), position[1])
+
+
+@pytest.mark.parametrize('cursor', [
+    '',
+    'not a cursor!',
+    'é',
+    base64.urlsafe_b64encode(b'not json').decode('ascii'),
+    raw_cursor([1.5]),
+    raw_cursor([1.5, 2, 3]),
+    raw_cursor(5),
+    raw_cursor({'len_views_ratio': 1.5, 'page_id': 2}),
+    raw_cursor([None, 2]),
+    raw_cursor(['1.5', 2]),
+    raw_cursor([True, 2]),
+    raw_cursor([1.5, 2.5]),
+    raw_cursor([1.5, '2']),
+    raw_cursor([float('nan'), 2]),
+    raw_cursor([float('inf'), 2]),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_next_and_resume_cursors():
+    articles = [{'len_views_ratio': 3.0, 'source_id': 1}, {'len_views_ratio': 2.5, 'source_id': 9}]
+    assert decode_cursor(next_cursor(articles, 2)) == (2.5, 9)
+    assert next_cursor(articles, 3) is None
+    assert decode_cursor(resume_cursor(articles, (4.0, 2))) == (2.5, 9)
+    assert decode_cursor(resume_cursor([], (4.0, 2))) == (4.0, 2)
+    assert resume_cursor([], None) is None
+
+
+def test_parse_categories():
+    assert parse_categories(' Physics,History ,,Physics, ') == ['History', 'Physics']
+    assert parse_categories('') == []
@@ -0,0 +1,72 @@
+import gzip
+import pytest
+
+from dump_parser import iter_dump_rows, iter_values
+from bench_dump_parser import PREFIX, legacy_parse
+
+# A categorylinks row as the dumps write it: id, to, sortkey, timestamp,
+# prefix, collation, type
+ROW = b"(%d,'%s','%s','2024-07-01 12:00:00','','uppercase','page')"
+
+
+def values(*rows):
+    return PREFIX + b",".join(rows) + b";\n"
+
+
+def parse(line, columns=None):
+    return list(iter_values(line, len(PREFIX), columns))
+
+
+def test_backslash_escapes():
+    line = values(b"(1,'It\\'s','C:\\\\Path','a\\nb\\tc\\0','\\\"q\\\"','\\Z','x')")
+    assert parse(line) == [(1, "It's", 'C:\\Path', 'a\nb\tc\x00', '"q"', '\x1a', 'x')]
+
+
+def test_row_separators_and_quotes_inside_titles():
+    line = values(ROW % (1, b"A),(B", b"A),(B"), ROW % (2, b"People\\'s_(band)", b"PEOPLE"),
+                  ROW % (3, b"x\\',\\'y", b"X"))
+    rows = parse(line, (0, 1))
+    assert rows == [(1, 'A),(B'), (2, "People's_(band)"), (3, "x','y")]
+
+
+def test_null_empty_and_numbers():
+    line = values(b"(1,NULL,'',-2.5,NULL)", b"(2,'',NULL,7,'z')")
+    assert parse(line) == [(1, None, '', -2.5, None), (2, '', None, 7, 'z')]
+    assert parse(line, (4, 0)) == [(None, 1), ('z', 2)]
+
+
+def test_row_of_another_shape_falls_back_to_tokens():
+    # The fast pattern is built for the first row's arity; the second row
+    # has one field more, so it and everything after go through the tokenizer
+    line = values(b"(1,'a','b')", b"(2,'c','d','extra')", b"(3,'e,f','g')")
+    assert parse(line) == [(1, 'a', 'b'), (2, 'c', 'd', 'extra'), (3, 'e,f', 'g')]
+    # Rows too short for the selected columns are dropped, not padded
+    assert parse(line, (0, 3)) == [(2, 'extra')]
+
+
+def test_utf8_titles():
+    line = values(ROW % (1, 'ירושלים'.encode(), 'ירושלים'.encode()))
+    assert parse(line, (1,)) == [('ירושלים',)]
+
+
+def test_matches_legacy_parser(tmp_path):
+    # No '),(' or escapes in the titles: the legacy parser got those wrong
+    rows = [ROW % (i, title, title.upper()) for i, title in
+            enumerate([b'History', b'Tel_Aviv', b'2010s_deaths', 'ירושלים'.encode()])]
+    path = tmp_path / 'categorylinks.sql.gz'
+    with gzip.open(path, 'wb') as file:
+        file.write(b"-- dump header\n" + values(*rows) + values(*rows[:2]))
+
+    expected = [[str(value) for value in row] for row in iter_dump_rows(path, 'categorylinks')]
+    assert expected == list(legacy_parse(path))
+    assert len(expected) == 6
+
+
+def test_workers_keep_dump_order(tmp_path):
+    path = tmp_path / 'categorylinks.sql.gz'
+    with gzip.open(path, 'wb') as file:
+        for start in range(0, 300, 30):
+            file.write(values(*(ROW % (i, b'T', b'T') for i in range(start, start + 30))))
+
+    rows = list(iter_dump_rows(path, 'categorylinks', (0,), workers=2, chunk_bytes=1 << 10))
+    assert rows == [(i,) for i in range(300)]
@@ -0,0 +1,59 @@
+import random
+import pytest
+
+pytest.importorskip('psycopg2')
+import page_sketches
+from page_sketches import estimate, estimate_union, merge
+from category_sketches import PRECISION, REGISTERS, add, encode
+
+
+def sketch(page_ids):
+    registers = bytearray(REGISTERS)
+    for page_id in page_ids:
+        add(registers, page_id)
+    return registers
+
+
+def test_builder_and_reader_agree_on_precision():
+    assert (PRECISION, REGISTERS) == (page_sketches.PRECISION, page_sketches.REGISTERS)
+
+
+def test_sparse_round_trip():
+    registers = sketch(range(50))
+    encoded = encode(registers)
+    assert len(encoded) < REGISTERS
+    assert len(encoded) == 2 * sum(1 for rank in registers if rank)
+    assert merge([encoded]) == registers
+
+
+def test_dense_round_trip():
+    registers = sketch(range(100000))
+    encoded = encode(registers)
+    assert len(encoded) == REGISTERS
+    assert merge([encoded]) == registers
+
+
+def test_merge_is_register_wise_max():
+    small, large = sketch(range(0, 30)), sketch(range(20, 50000))
+    assert merge([encode(small), encode(large)]) == bytearray(map(max, small, large))
+    assert merge([]) == bytearray(REGISTERS)
+    assert estimate_union([]) == 0
+    assert estimate_union([encode(bytearray(REGISTERS))]) == 0
+
+
+@pytest.mark.parametrize('size', [1, 10, 100, 1000, 10000, 100000])
+def test_estimate_error(size):
+    # About 3% standard error; small sets fall back to linear counting
+    page_ids = random.Random(size).sample(range(10 * size), size)
+    assert estimate(sketch(page_ids)) == pytest.approx(size, rel=0.1, abs=1)
+
+
+def test_union_estimate_error():
+    rng = random.Random(1)
+    # Overlapping categories of very different sizes, sparse and dense
+    members = [set(rng.sample(range(200000), rng.choice([5, 50, 500, 5000, 50000]))) for _ in range(40)]
+    exact = len(set().union(*members))
+    sketches = [encode(sketch(page_ids)) for page_ids in members]
+    assert estimate_union(sketches) == pytest.approx(exact, rel=0.1)
+    # Repeating a category changes nothing
+    assert estimate_union(sketches + sketches[:5]) == estimate_union(sketches)
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+
+pytest.importorskip('requests')
+from stub_wiki_api import start_stub_server, categories_of
+from wiki_api import ApiMetrics, MAX_TITLES_PER_CALL, WikiApiClient, AsyncWikiApiClient, WikiApiError
+
+# Underscores exercise normalization; titles of 10+ characters have enough
+# categories to need a 'continue' response at 4 per response
+TITLES = [f"Article_{i}" if i % 3 else f"Article {i} " + "x" * (i % 40) for i in range(120)]
+
+
+@pytest.fixture
+def server():
+    server = start_stub_server()
+    yield server
+    server.shutdown()
+
+
+def category_titles(pages, titles):
+    return {title: [cat['title'] for cat in pages.get(title, {}).get('categories', [])] for title in titles}
+
+
+def expected_categories(titles):
+    return {title: categories_of(title.replace('_', ' ')) for title in titles}
+
+
+def sync_categories(server, titles, **kwargs):
+    client = WikiApiClient(api_url=server.url, metrics=ApiMetrics(), **kwargs)
+    return client, client.query_titles(titles, {'prop': 'categories', 'cllimit': 'max'})
+
+
+def async_categories(server, titles, **kwargs):
+    pytest.importorskip('httpx')
+
+    async def run():
+        client = AsyncWikiApiClient(api_url=server.url, metrics=ApiMetrics(), **kwargs)
+        try:
+            return client, await client.query_titles(titles, {'prop': 'categories', 'cllimit': 'max'})
+        finally:
+            await client.client.aclose()
+    return asyncio.run(run())
+
+
+@pytest.fixture(params=['sync', 'async'])
+def query_categories(request):
+    return sync_categories if request.param == 'sync' else async_categories
+
+
+def test_titles_are_sent_in_batches_of_50(server, query_categories):
+    query_categories(server, TITLES)
+    assert max(server.titles_per_call) == MAX_TITLES_PER_CALL
+    # 120 titles: batches of 50, 50 and 20, each call carrying its whole batch
+    assert sorted(set(server.titles_per_call)) == [20, MAX_TITLES_PER_CALL]
+
+
+def test_duplicate_titles_are_queried_once(server, query_categories):
+    _, pages = query_categories(server, ['Article_1', 'Article_1', 'Article_2'])
+    assert server.titles_per_call == [2]
+    assert category_titles(pages, ['Article_1', 'Article_2']) == expected_categories(['Article_1', 'Article_2'])
+
+
+def test_continue_responses_are_followed_and_merged(server, query_categories):
+    _, pages = query_categories(server, TITLES)
+    # Three batches, some of whose titles need more than one call
+    assert len(server.titles_per_call) > 3
+    assert category_titles(pages, TITLES) == expected_categories(TITLES)
+
+
+def test_query_follows_watchlist_continuation(server):
+    client = WikiApiClient(api_url=server.url, metrics=ApiMetrics())
+    responses = list(client.query({'list': 'watchlist', 'wllimit': 'max'}, token='t'))
+    assert len(responses) == 3
+    assert sum(len(data['query']['watchlist']) for data in responses) == server.watchlist_size
+
+
+@pytest.mark.parametrize('throttle_status', [200, 429, 503])
+def test_throttled_calls_are_retried(server, query_categories, throttle_status):
+    # 200 answers with a maxlag error; every throttled response carries Retry-After: 0
+    server.maxlag_every = 3
+    server.throttle_status = throttle_status
+    client, pages = query_categories(server, TITLES)
+    assert category_titles(pages, TITLES) == expected_categories(TITLES)
+    retries = sum(metrics['retries'] for metrics in client.stats().values())
+    assert retries == server.calls // 3
+
+
+@pytest.mark.parametrize('throttle_status', [200, 429, 503])
+def test_gives_up_after_max_retries(server, query_categories, throttle_status):
+    server.maxlag_every = 1
+    server.throttle_status = throttle_status
+    with pytest.raises(WikiApiError, match='still throttled after 2 retries'):
+        query_categories(server, ['Article_1'], max_retries=2)
+    assert server.calls == 3
@@ -1,16 +1,14 @@
 import logging
-import os
 from flask import Blueprint, request, jsonify, session
-from requests_oauthlib import OAuth2Session
+from wiki_api import get_async_api
+from sessions import uses_session
 
 watchlist_bp = Blueprint('watchlist', __name__)
 logger = logging.getLogger(__name__)
 
-# OAuth configuration from environment variables
-client_id = os.getenv('CLIENT_ID')
-
 @watchlist_bp.route('/fetch_watchlist', methods=['GET'])
-def fetch_watchlist():
+@uses_session
+async def fetch_watchlist():
     try:
         token = session.get('wiki_oauth_token')
         if not token:
@@ -18,36 +16,23 @@ def fetch_watchlist():
             return jsonify({'error': 'User not authenticated'}), 401
 
         logger.debug(f'Fetching watchlist for user {session.get("username")}')
-        wikipedia = OAuth2Session(client_id, token={'access_token': token['access_token']})
-
-        # API endpoint for watchlist
-        api_url = 'https://en.wikipedia.org/w/api.php'
 
         # Parameters for the watchlist query
         params = {
-            'action': 'query',
-            'format': 'json',
             'list': 'watchlist',
             'wltype': 'edit|new',
             'wllimit': 'max'  # Get maximum number of results
         }
 
-        # Make the API request
-        response = wikipedia.get(api_url, params=params)
-        logger.debug(f'Response status: {response.status_code}')
-        logger.debug(f'Response content: {response.text}')
+        # Follow 'continue' so watchlists longer than one page come back whole
+        watchlist_titles = []
+        async for watchlist_data in get_async_api().query(params, token=token['access_token']):
+            if 'query' not in watchlist_data or 'watchlist' not in watchlist_data['query']:
+                logger.error(f'Watchlist data is missing from the response: {watchlist_data}')
+                return jsonify({'error': 'Watchlist data missing'}), 500
+            watchlist_titles.extend(item['title'] for item in watchlist_data['query']['watchlist'])
 
-        if response.status_code != 200:
-            logger.error(f'Failed to fetch watchlist: {response.text}')
-            return jsonify({'error': 'Failed to fetch watchlist'}), 500
-
-        watchlist_data = response.json()
-        if 'query' in watchlist_data and 'watchlist' in watchlist_data['query']:
-            watchlist_titles = [item['title'] for item in watchlist_data['query']['watchlist']]
-            return jsonify({'watchlist': watchlist_titles})
-        else:
-            logger.error('Watchlist data is missing from the response')
-            return jsonify({'error': 'Watchlist data missing'}), 500
+        return jsonify({'watchlist': watchlist_titles})
 
     except Exception as e:
         logger.error(f'Error fetching watchlist: {e}')
@@ -55,7 +40,8 @@ def fetch_watchlist():
 
 
 @watchlist_bp.route('/remove_from_watchlist', methods=['POST'])
-def remove_from_inventory():
+@uses_session
+async def remove_from_inventory():
     try:
         # Try cookies first, then fall back to session
         access_token = request.cookies.get('access_token')
@@ -72,29 +58,18 @@ def remove_from_inventory():
             logger.warning('No title provided in the request')
             return jsonify({'error': 'No title provided'}), 400
 
-        # Create Wikipedia session with proper headers
-        wikipedia = OAuth2Session(client_id)
-        wikipedia.headers.update({
-            'User-Agent': 'MissingpediaToolforge/1.0',
-            'Authorization': f'Bearer {access_token}',
-            'Accept': 'application/json'
-        })
-
-        api_url = 'https://en.wikipedia.org/w/api.php'
-        
         # Try to get a watch token instead of csrf token
         token_params = {
             'action': 'query',
             'meta': 'tokens',
-            'type': 'watch',  # Changed from csrf to watch
-            'format': 'json'
+            'type': 'watch'  # Changed from csrf to watch
         }
         
-        token_response = wikipedia.get(api_url, params=token_params)
-        logger.debug(f'Token response: {token_response.text}')
+        token_response = await get_async_api().get(token_params, token=access_token)
+        logger.debug(f'Token response: {token_response}')
         
         try:
-            watch_token = token_response.json()['query']['tokens']['watchtoken']
+            watch_token = token_response['query']['tokens']['watchtoken']
             logger.debug(f'Got watch token: {watch_token[:5]}...')
         except (KeyError, TypeError) as e:
             logger.error(f'Failed to extract watch token: {e}')
@@ -103,21 +78,14 @@ def remove_from_inventory():
         # Remove from watchlist using watch token
         remove_data = {
             'action': 'watch',
-            'format': 'json',
             'titles': title_to_remove,
             'unwatch': '1',
             'token': watch_token
         }
 
-        remove_response = wikipedia.post(
-            api_url,
-            data=remove_data,
-            headers={'Content-Type': 'application/x-www-form-urlencoded'}
-        )
-        
-        logger.debug(f'Unwatch response: {remove_response.text}')
+        response_json = await get_async_api().post(remove_data, token=access_token)
+        logger.debug(f'Unwatch response: {response_json}')
 
-        response_json = remove_response.json()
         if 'error' not in response_json:
             logger.info(f'Successfully removed {title_to_remove} from watchlist')
             return jsonify({'success': True, 'message': f'{title_to_remove} removed from watchlist'})
@@ -135,7 +103,8 @@ def remove_from_inventory():
 
 
 @watchlist_bp.route('/add_to_watchlist', methods=['POST'])
-def add_to_watchlist():
+@uses_session
+async def add_to_watchlist():
     try:
         # Try cookies first, then fall back to session
         access_token = request.cookies.get('access_token')
@@ -161,29 +130,18 @@ def add_to_watchlist():
             logger.warning('Could not extract title from article data')
             return jsonify({'error': 'No valid title found in article data'}), 400
 
-        # Create Wikipedia session with proper headers
-        wikipedia = OAuth2Session(client_id)
-        wikipedia.headers.update({
-            'User-Agent': 'MissingpediaToolforge/1.0',
-            'Authorization': f'Bearer {access_token}',
-            'Accept': 'application/json'
-        })
-
-        api_url = 'https://en.wikipedia.org/w/api.php'
-        
         # Get watch token
         token_params = {
             'action': 'query',
             'meta': 'tokens',
-            'type': 'watch',
-            'format': 'json'
+            'type': 'watch'
         }
         
-        token_response = wikipedia.get(api_url, params=token_params)
-        logger.debug(f'Token response: {token_response.text}')
+        token_response = await get_async_api().get(token_params, token=access_token)
+        logger.debug(f'Token response: {token_response}')
         
         try:
-            watch_token = token_response.json()['query']['tokens']['watchtoken']
+            watch_token = token_response['query']['tokens']['watchtoken']
             logger.debug(f'Got watch token: {watch_token[:5]}...')
         except (KeyError, TypeError) as e:
             logger.error(f'Failed to extract watch token: {e}')
@@ -192,20 +150,13 @@ def add_to_watchlist():
         # Add to watchlist using watch token
         add_data = {
             'action': 'watch',
-            'format': 'json',
             'titles': title_to_add,
             'token': watch_token
         }
 
-        add_response = wikipedia.post(
-            api_url,
-            data=add_data,
-            headers={'Content-Type': 'application/x-www-form-urlencoded'}
-        )
-        
-        logger.debug(f'Watch response: {add_response.text}')
+        response_json = await get_async_api().post(add_data, token=access_token)
+        logger.debug(f'Watch response: {response_json}')
 
-        response_json = add_response.json()
         if 'error' not in response_json:
             logger.info(f'Successfully added {title_to_add} to watchlist')
             return jsonify({'success': True, 'message': f'{title_to_add} added to watchlist'})
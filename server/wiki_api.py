@@ -0,0 +1,352 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+API_URL = os.getenv('WIKI_API_URL', 'https://en.wikipedia.org/w/api.php')
+USER_AGENT = 'MissingpediaToolforge/1.0'
+# The API accepts at most 50 titles per call for non-bot users
+MAX_TITLES_PER_CALL = 50
+
+
+class WikiApiError(Exception):
+    pass
+
+
+class ApiMetrics:
+    """Per-call latency, retry and error counts, shared by every client in the process."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed, error=False, retry=False):
+        with self._lock:
+            metrics = self._metrics.setdefault(
+                name, {'calls': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            metrics['calls'] += 1
+            metrics['errors'] += int(error)
+            metrics['retries'] += int(retry)
+            metrics['total_ms'] += elapsed * 1000
+            metrics['max_ms'] = max(metrics['max_ms'], elapsed * 1000)
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {
+                    **metrics,
+                    'avg_ms': metrics['total_ms'] / metrics['calls'] if metrics['calls'] else 0.0,
+                }
+                for name, metrics in self._metrics.items()
+            }
+
+
+metrics = ApiMetrics()
+
+
+class _BaseClient:
+    def __init__(self, api_url, max_concurrency, max_retries, maxlag, timeout, metrics):
+        self.api_url = api_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.maxlag = maxlag
+        self.timeout = timeout
+        self.metrics = metrics
+
+    def stats(self):
+        return self.metrics.stats()
+
+    def _prepare(self, params, token):
+        params = {'format': 'json', 'maxlag': self.maxlag, **params}
+        headers = {'Authorization': f'Bearer {token}'} if token else None
+        return params, headers, self._call_name(params)
+
+    def _check(self, name, response, elapsed):
+        if response.status_code != 200:
+            self.metrics.record(name, elapsed, error=True)
+            raise WikiApiError(f'{name}: HTTP {response.status_code}: {response.text[:200]}')
+        self.metrics.record(name, elapsed)
+        return response.json()
+
+    def _throttled(self, name, response, elapsed, attempt):
+        """Return how long to wait before retrying, or None if the response is final."""
+        delay = self._retry_delay(response)
+        if delay is None:
+            return None
+        self.metrics.record(name, elapsed, retry=True)
+        if attempt == self.max_retries:
+            raise WikiApiError(f'{name}: still throttled after {self.max_retries} retries')
+        logger.info(f'{name}: throttled, retrying in {delay}s')
+        return delay
+
+    @staticmethod
+    def _batches(titles):
+        titles = list(dict.fromkeys(titles))
+        return [titles[i:i + MAX_TITLES_PER_CALL] for i in range(0, len(titles), MAX_TITLES_PER_CALL)]
+
+    @staticmethod
+    def _merge_pages(titles, responses):
+        """Merge the pages of a batch's responses and key them by the titles asked for."""
+        merged = {}
+        aliases = {}
+        for data in responses:
+            result = data.get('query', {})
+            for step in ('normalized', 'redirects'):
+                for alias in result.get(step, []):
+                    aliases[alias['from']] = alias['to']
+            for page in result.get('pages', {}).values():
+                target = merged.setdefault(page['title'], {})
+                for key, value in page.items():
+                    if isinstance(value, list):
+                        target.setdefault(key, []).extend(value)
+                    else:
+                        target[key] = value
+
+        pages = {}
+        for title in titles:
+            resolved = title
+            # Follow normalization, then a redirect, back to the page the API returned
+            while resolved in aliases and resolved not in merged:
+                resolved = aliases[resolved]
+            if resolved in merged:
+                pages[title] = merged[resolved]
+        return pages
+
+    @staticmethod
+    def _retry_delay(response):
+        if response.status_code in (429, 503):
+            return float(response.headers.get('Retry-After', 5))
+        if response.status_code == 200 and 'maxlag' in response.headers.get('MediaWiki-API-Error', ''):
+            return float(response.headers.get('Retry-After', 5))
+        return None
+
+    @staticmethod
+    def _call_name(params):
+        action = params.get('action', '')
+        detail = params.get('list') or params.get('prop') or params.get('meta')
+        return f'{action}:{detail}' if detail else action
+
+
+class WikiApiClient(_BaseClient):
+    """Shared MediaWiki API client.
+
+    One keep-alive session serves every caller, so TCP/TLS connections are
+    reused across requests. Calls send ``maxlag`` and back off on maxlag errors,
+    429 and 503 as told by Retry-After. Title lists are split into batches of
+    ``MAX_TITLES_PER_CALL`` that run on a bounded thread pool, and ``continue``
+    responses are followed and merged.
+    """
+
+    def __init__(self, api_url=API_URL, max_concurrency=4, max_retries=3, maxlag=5, timeout=10, metrics=metrics):
+        super().__init__(api_url, max_concurrency, max_retries, maxlag, timeout, metrics)
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency * 2)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='wiki-api')
+
+    def get(self, params, token=None):
+        return self.request('GET', params, token=token)
+
+    def post(self, data, token=None):
+        return self.request('POST', data, token=token)
+
+    def request(self, method, params, token=None):
+        """Make one API call and return the decoded JSON, retrying while the servers ask us to wait."""
+        params, headers, name = self._prepare(params, token)
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                if method == 'GET':
+                    response = self.session.get(self.api_url, params=params, headers=headers, timeout=self.timeout)
+                else:
+                    response = self.session.post(self.api_url, data=params, headers=headers, timeout=self.timeout)
+            except requests.RequestException:
+                self.metrics.record(name, time.perf_counter() - start, error=True)
+                raise
+            elapsed = time.perf_counter() - start
+
+            delay = self._throttled(name, response, elapsed, attempt)
+            if delay is None:
+                return self._check(name, response, elapsed)
+            time.sleep(delay)
+
+    def query(self, params, token=None):
+        """Yield every response of an action=query, following 'continue' to the end."""
+        params = {**params, 'action': 'query'}
+        continuation = {}
+        while True:
+            data = self.get({**params, **continuation}, token=token)
+            yield data
+            if 'continue' not in data:
+                return
+            continuation = data['continue']
+
+    def query_titles(self, titles, params, token=None):
+        """Query any number of titles and return {requested title: merged page info}.
+
+        Titles are sent 50 per call, calls run concurrently, and list-valued
+        page properties split across 'continue' responses are merged.
+        """
+        def query_batch(batch):
+            return self._merge_pages(batch, self.query({**params, 'titles': '|'.join(batch)}, token=token))
+
+        pages = {}
+        for batch_pages in self._executor.map(query_batch, self._batches(titles)):
+            pages.update(batch_pages)
+        return pages
+
+
+class AsyncWikiApiClient(_BaseClient):
+    """The same client for async views, on an httpx connection pool.
+
+    A semaphore bounds the calls in flight instead of a thread pool, so any
+    number of requests waiting on the API share the event loop's one thread.
+    """
+
+    def __init__(self, api_url=API_URL, max_concurrency=4, max_retries=3, maxlag=5, timeout=10, metrics=metrics):
+        import httpx
+        super().__init__(api_url, max_concurrency, max_retries, maxlag, timeout, metrics)
+        self._error = httpx.HTTPError
+        self.client = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency * 2, max_keepalive_connections=max_concurrency * 2)
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def get(self, params, token=None):
+        return await self.request('GET', params, token=token)
+
+    async def post(self, data, token=None):
+        return await self.request('POST', data, token=token)
+
+    async def request(self, method, params, token=None):
+        params, headers, name = self._prepare(params, token)
+        for attempt in range(self.max_retries + 1):
+            async with self._slots:
+                start = time.perf_counter()
+                try:
+                    if method == 'GET':
+                        response = await self.client.get(self.api_url, params=params, headers=headers)
+                    else:
+                        response = await self.client.post(self.api_url, data=params, headers=headers)
+                except self._error:
+                    self.metrics.record(name, time.perf_counter() - start, error=True)
+                    raise
+                elapsed = time.perf_counter() - start
+
+            delay = self._throttled(name, response, elapsed, attempt)
+            if delay is None:
+                return self._check(name, response, elapsed)
+            await asyncio.sleep(delay)
+
+    async def query(self, params, token=None):
+        params = {**params, 'action': 'query'}
+        continuation = {}
+        while True:
+            data = await self.get({**params, **continuation}, token=token)
+            yield data
+            if 'continue' not in data:
+                return
+            continuation = data['continue']
+
+    async def query_titles(self, titles, params, token=None):
+        async def query_batch(batch):
+            responses = [data async for data in self.query({**params, 'titles': '|'.join(batch)}, token=token)]
+            return self._merge_pages(batch, responses)
+
+        pages = {}
+        for batch_pages in await asyncio.gather(*(query_batch(batch) for batch in self._batches(titles))):
+            pages.update(batch_pages)
+        return pages
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class ThreadedWikiApi:
+    """AsyncWikiApiClient's interface over the shared sync client, run on worker threads.
+
+    For event loops that live for one request: an httpx pool opened on one
+    would be dropped unclosed with the loop and never reused, while the sync
+    client's keep-alive pool serves the whole process.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def stats(self):
+        return self.client.stats()
+
+    async def get(self, params, token=None):
+        return await asyncio.to_thread(self.client.get, params, token)
+
+    async def post(self, data, token=None):
+        return await asyncio.to_thread(self.client.post, data, token)
+
+    async def request(self, method, params, token=None):
+        return await asyncio.to_thread(self.client.request, method, params, token)
+
+    async def query(self, params, token=None):
+        responses = self.client.query(params, token=token)
+        while True:
+            data = await asyncio.to_thread(next, responses, None)
+            if data is None:
+                return
+            yield data
+
+    async def query_titles(self, titles, params, token=None):
+        return await asyncio.to_thread(self.client.query_titles, titles, params, token)
+
+
+def _client_settings():
+    return {
+        'max_concurrency': int(os.getenv('WIKI_API_CONCURRENCY', 4)),
+        'maxlag': int(os.getenv('WIKI_API_MAXLAG', 5)),
+    }
+
+
+api = WikiApiClient(**_client_settings())
+threaded_api = ThreadedWikiApi(api)
+
+_async_clients = weakref.WeakKeyDictionary()
+_long_lived_loops = weakref.WeakSet()
+
+
+def keep_async_api(loop):
+    """Mark an event loop as outliving requests, so get_async_api keeps an httpx pool on it."""
+    _long_lived_loops.add(loop)
+
+
+async def close_async_api():
+    """Close the running loop's httpx client, if it has one; the ASGI server calls this on shutdown."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def get_async_api():
+    """Return the async client for the running event loop.
+
+    httpx connections belong to the loop that opened them. The ASGI server
+    runs one loop per worker and marks it with keep_async_api, so it gets
+    one long-lived httpx pool. When Flask runs an async view under WSGI,
+    each request gets a throwaway loop; those share the sync client's pool
+    through threaded_api instead.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _long_lived_loops:
+        return threaded_api
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncWikiApiClient(**_client_settings())
+    return client
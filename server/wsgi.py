@@ -0,0 +1,7 @@
+"""WSGI entry point for servers without ASGI support; production runs asgi.py."""
+import os
+
+# Production settings unless the deployment chose otherwise
+os.environ.setdefault('APP_CONFIG', 'production')
+
+from app import app